@@ -0,0 +1,187 @@
+# activity_profile.py
+import itertools
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+TOP_SUBREDDITS = int(os.getenv("ACTIVITY_TOP_SUBREDDITS", "6"))
+VOCAB_SAMPLE_WORDS = int(os.getenv("ACTIVITY_VOCAB_SAMPLE_WORDS", "2000"))
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday; this shifts day numbers so Monday is 0.
+_EPOCH_WEEKDAY = 3
+
+_WORD_RE = re.compile(r"[a-z][a-z']*")
+
+
+class ActivityColumns:
+    """One array per signal over a user's items, in listing order."""
+
+    __slots__ = ("is_comment", "subreddits", "created_utc", "lengths", "texts")
+
+    def __init__(self, is_comment, subreddits, created_utc, lengths, texts: List[str]):
+        self.is_comment = is_comment
+        self.subreddits = subreddits
+        self.created_utc = created_utc
+        self.lengths = lengths
+        self.texts = texts
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "ActivityColumns":
+        kinds, subreddits, created, texts = [], [], [], []
+        for record in records:
+            kinds.append(record.get("type") == "comment")
+            subreddits.append(record.get("subreddit") or "")
+            created.append(record.get("created_utc") or np.nan)
+            texts.append(
+                " ".join(part for part in (record.get("title"), record.get("body")) if part)
+            )
+        return cls._build(kinds, subreddits, np.asarray(created, dtype=np.float64), texts)
+
+    @classmethod
+    def _build(cls, kinds, subreddits, created, texts) -> "ActivityColumns":
+        return cls(
+            np.asarray(kinds, dtype=bool),
+            # Fixed-width unicode, so counting sorts in C instead of comparing objects.
+            np.asarray(subreddits, dtype=str),
+            created,
+            np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)),
+            texts,
+        )
+
+
+def vocabulary_richness(texts: List[str], newest_first, sample_words: int = VOCAB_SAMPLE_WORDS) -> Dict:
+    """
+    Distinct words per word over the user's newest `sample_words` words. A
+    fixed-size sample keeps the ratio comparable between users with short
+    and long histories; it falls with sample size otherwise.
+    """
+    words: List[str] = []
+    for index in newest_first:
+        words.extend(_WORD_RE.findall(texts[index].lower()))
+        if len(words) >= sample_words:
+            break
+    words = words[:sample_words]
+    if not words:
+        return {"sample_words": 0, "type_token_ratio": None}
+    distinct = np.unique(np.asarray(words, dtype=str)).size
+    return {"sample_words": len(words), "type_token_ratio": round(distinct / len(words), 3)}
+
+
+def activity_profile(columns: ActivityColumns, about: Optional[Dict] = None) -> Dict:
+    """
+    Structural signals over a user's items that the LLM would otherwise have
+    to infer from raw text: where they post, when, how much, and how they
+    write. Everything but the word sample is computed over whole arrays.
+    """
+    count = columns.lengths.size
+    comments = int(columns.is_comment.sum())
+    posts = count - comments
+
+    names, counts = np.unique(columns.subreddits[columns.subreddits != ""], return_counts=True)
+    top = np.argsort(-counts, kind="stable")[:TOP_SUBREDDITS]
+    named_total = max(int(counts.sum()), 1)
+
+    created = columns.created_utc[~np.isnan(columns.created_utc)]
+    days = np.floor_divide(created, SECONDS_PER_DAY)
+    hours = (np.floor_divide(created, 3600) % 24).astype(np.int64)
+    weekdays = ((days + _EPOCH_WEEKDAY) % 7).astype(np.int64)
+
+    profile = {
+        "items": count,
+        "posts": posts,
+        "comments": comments,
+        "comments_per_post": round(comments / posts, 1) if posts else None,
+        "subreddits": {
+            "distinct": int(names.size),
+            "top": [[str(names[i]), round(counts[i] / named_total, 3)] for i in top],
+        },
+        "hours_utc": np.bincount(hours, minlength=24).tolist(),
+        "weekdays": np.bincount(weekdays, minlength=7).tolist(),
+        "active_days": int(np.unique(days).size),
+        "span_days": int((days.max() - days.min()) + 1) if days.size else 0,
+        "text_length": {
+            "median": int(np.median(columns.lengths)) if count else 0,
+            "p90": int(np.percentile(columns.lengths, 90)) if count else 0,
+        },
+        "vocabulary": vocabulary_richness(
+            columns.texts, np.argsort(-np.nan_to_num(columns.created_utc, nan=0.0), kind="stable")
+        ),
+    }
+
+    if about:
+        karma = {
+            name: about[name]
+            for name in ("post_karma", "comment_karma", "total_karma")
+            if about.get(name) is not None
+        }
+        if karma:
+            profile["karma"] = karma
+        if about.get("created_utc") and created.size:
+            # Measured to the newest item rather than now, so the summary (and
+            # the prompt cache key) only changes when the history does.
+            age_days = (created.max() - about["created_utc"]) / SECONDS_PER_DAY
+            profile["account_age_years"] = round(max(age_days, 0) / 365.25, 1)
+    return profile
+
+
+def _percentages(counts: List[int]) -> List[int]:
+    total = sum(counts) or 1
+    return [round(100 * c / total) for c in counts]
+
+
+def render_activity_summary(profile: Dict) -> str:
+    """The profile as a few compact lines for the prompt."""
+    if not profile["items"]:
+        return ""
+    lines = []
+
+    ratio = profile["comments_per_post"]
+    lines.append(
+        f"- {profile['posts']} posts, {profile['comments']} comments"
+        + (f" ({ratio} comments per post)" if ratio is not None else "")
+        + f" over {profile['span_days']} days, active on {profile['active_days']} of them"
+    )
+
+    subreddits = profile["subreddits"]
+    if subreddits["top"]:
+        top = ", ".join(f"r/{name} {round(share * 100)}%" for name, share in subreddits["top"])
+        lines.append(f"- Subreddits ({subreddits['distinct']} distinct): {top}")
+
+    if sum(profile["hours_utc"]):
+        blocks = [sum(profile["hours_utc"][h:h + 4]) for h in range(0, 24, 4)]
+        hours = ", ".join(
+            f"{h:02d}-{h + 4:02d} {p}%" for h, p in zip(range(0, 24, 4), _percentages(blocks))
+        )
+        lines.append(f"- Posting hours (UTC): {hours}")
+        days = ", ".join(
+            f"{day} {p}%" for day, p in zip(WEEKDAYS, _percentages(profile["weekdays"]))
+        )
+        lines.append(f"- Weekdays: {days}")
+
+    length = profile["text_length"]
+    lines.append(f"- Text length: median {length['median']} chars, 90th percentile {length['p90']}")
+
+    vocabulary = profile["vocabulary"]
+    if vocabulary["type_token_ratio"] is not None:
+        lines.append(
+            f"- Vocabulary richness: {vocabulary['type_token_ratio']} distinct words per word "
+            f"over their newest {vocabulary['sample_words']} words"
+        )
+
+    if profile.get("karma") or profile.get("account_age_years") is not None:
+        parts = [f"{name.replace('_', ' ')} {value}" for name, value in profile.get("karma", {}).items()]
+        if profile.get("account_age_years") is not None:
+            parts.append(f"account age {profile['account_age_years']} years")
+        lines.append(f"- Profile: {', '.join(parts)}")
+
+    return "\n".join(lines)
+
+
+def summarize_activity(posts: List[Dict], comments: List[Dict], about: Optional[Dict] = None) -> str:
+    columns = ActivityColumns.from_records(itertools.chain(posts, comments))
+    return render_activity_summary(activity_profile(columns, about))
@@ -0,0 +1,268 @@
+# batch.py
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+BATCH_DIR = os.path.join(CACHE_DIR, "batch_jobs")
+
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "4"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+
+# Requests per second allowed towards each host across all batch workers.
+HOST_RATES = {
+    "reddit": float(os.getenv("BATCH_REDDIT_RPS", "1")),
+    "openrouter": float(os.getenv("BATCH_LLM_RPS", "0.3")),
+}
+
+
+class AsyncRateLimiter:
+    """Token bucket shared by the coroutines calling one host."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BatchScheduler:
+    """
+    Runs batch jobs as a two-stage pipeline. Scrape workers and persona
+    workers pull from separate queues with their own concurrency limits, so
+    scraping the next users overlaps with LLM calls for earlier ones.
+
+    Job state is written to BATCH_DIR/<job_id>/ after every stage
+    transition, one file per item. A failed stage is retried on its own
+    without redoing earlier ones, and unfinished jobs are requeued on
+    start().
+    """
+
+    def __init__(
+        self,
+        scrape: Callable[[str], Awaitable[Dict]],
+        persona: Callable[[Dict, bool], Awaitable[Dict]],
+        directory: str = BATCH_DIR,
+    ):
+        self._scrape = scrape
+        self._persona = persona
+        self.directory = directory
+        self.jobs: Dict[str, Dict] = {}
+
+        self._scrape_queue: asyncio.Queue = None
+        self._llm_queue: asyncio.Queue = None
+        self._limiters = {host: AsyncRateLimiter(rate) for host, rate in HOST_RATES.items()}
+        self._workers: List[asyncio.Task] = []
+        self._retries = set()
+        self._save_locks: Dict[str, asyncio.Lock] = {}
+
+    async def start(self) -> None:
+        self._scrape_queue = asyncio.Queue()
+        self._llm_queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(self._scrape_queue, self._run_scrape))
+            for _ in range(BATCH_SCRAPE_CONCURRENCY)
+        ] + [
+            asyncio.create_task(self._worker(self._llm_queue, self._run_persona))
+            for _ in range(BATCH_LLM_CONCURRENCY)
+        ]
+
+        os.makedirs(self.directory, exist_ok=True)
+        for job in await asyncio.to_thread(_load_jobs, self.directory):
+            self.jobs[job["job_id"]] = job
+            if job["status"] != "completed":
+                logging.info(f"[Batch] Resuming job {job['job_id']}")
+                self._enqueue_pending(job)
+
+    async def stop(self) -> None:
+        tasks = self._workers + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, usernames: List[str], use_cache: bool = True) -> Dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "running",
+            "created_at": time.time(),
+            "use_cache": use_cache,
+            "items": [
+                {
+                    "username": username,
+                    "status": "pending",
+                    "attempts": {"scrape": 0, "persona": 0},
+                    "scrape": None,
+                    "persona": None,
+                    "error": None,
+                }
+                for username in usernames
+            ],
+        }
+        self.jobs[job["job_id"]] = job
+        await asyncio.to_thread(_write_job, self.directory, job)
+        self._enqueue_pending(job)
+        return job
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        counts = {}
+        for item in job["items"]:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "total": len(job["items"]),
+            "counts": counts,
+        }
+
+    def _enqueue_pending(self, job: Dict) -> None:
+        for index, item in enumerate(job["items"]):
+            if item["status"] == "pending":
+                self._scrape_queue.put_nowait((job["job_id"], index))
+            elif item["status"] == "scraped":
+                self._llm_queue.put_nowait((job["job_id"], index))
+
+    async def _worker(self, queue: asyncio.Queue, run) -> None:
+        while True:
+            job_id, index = await queue.get()
+            try:
+                await run(self.jobs[job_id], index)
+            except Exception as e:
+                logging.error(f"[Batch] Worker error on {job_id}[{index}]: {e}")
+            finally:
+                queue.task_done()
+
+    async def _run_scrape(self, job: Dict, index: int) -> None:
+        item = job["items"][index]
+        item["attempts"]["scrape"] += 1
+        await self._limiters["reddit"].acquire()
+        try:
+            item["scrape"] = await self._scrape(item["username"])
+            item["status"] = "scraped"
+            item["error"] = None
+            self._llm_queue.put_nowait((job["job_id"], index))
+        except Exception as e:
+            self._retry_or_fail(job, index, "scrape", e, self._scrape_queue)
+        await self._save(job, index)
+
+    async def _run_persona(self, job: Dict, index: int) -> None:
+        item = job["items"][index]
+        item["attempts"]["persona"] += 1
+        await self._limiters["openrouter"].acquire()
+        try:
+            item["persona"] = await self._persona(item["scrape"], job["use_cache"])
+            item["status"] = "done"
+            item["error"] = None
+            # Only the persona stage reads the scrape; don't hold every
+            # user's posts and comments for the life of the job.
+            item["scrape"] = None
+        except Exception as e:
+            self._retry_or_fail(job, index, "persona", e, self._llm_queue)
+        self._update_job_status(job)
+        await self._save(job, index)
+
+    def _retry_or_fail(
+        self, job: Dict, index: int, stage: str, error: Exception, queue: asyncio.Queue
+    ) -> None:
+        item = job["items"][index]
+        item["error"] = f"{stage}: {getattr(error, 'detail', None) or error}"
+        if item["attempts"][stage] >= BATCH_MAX_ATTEMPTS:
+            logging.warning(f"[Batch] {item['username']} failed at {stage}: {error}")
+            item["status"] = "failed"
+            self._update_job_status(job)
+            return
+
+        async def requeue():
+            await asyncio.sleep(2 ** item["attempts"][stage])
+            queue.put_nowait((job["job_id"], index))
+
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    @staticmethod
+    def _update_job_status(job: Dict) -> None:
+        if all(item["status"] in ("done", "failed") for item in job["items"]):
+            job["status"] = "completed"
+
+    async def _save(self, job: Dict, index: int) -> None:
+        # Each item is its own file, so a stage transition rewrites one
+        # item rather than the whole job. Writes for one item are serialized
+        # so an older snapshot can never land on disk after a newer one.
+        path = _item_path(self.directory, job["job_id"], index)
+        lock = self._save_locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            item = job["items"][index]
+            snapshot = {**item, "attempts": dict(item["attempts"])}
+            await asyncio.to_thread(_write_atomic, path, snapshot)
+
+
+def _job_dir(directory: str, job_id: str) -> str:
+    return os.path.join(directory, job_id)
+
+
+def _item_path(directory: str, job_id: str, index: int) -> str:
+    return os.path.join(_job_dir(directory, job_id), f"item_{index}.json")
+
+
+def _write_job(directory: str, job: Dict) -> None:
+    # Items first: job.json is written last, so its presence marks a
+    # complete job on disk.
+    for index, item in enumerate(job["items"]):
+        _write_atomic(_item_path(directory, job["job_id"], index), item)
+    meta = {key: value for key, value in job.items() if key not in ("items", "status")}
+    _write_atomic(os.path.join(_job_dir(directory, job["job_id"]), "job.json"), {
+        **meta, "total": len(job["items"]),
+    })
+
+
+def _load_jobs(directory: str) -> List[Dict]:
+    jobs = []
+    for name in os.listdir(directory):
+        meta_path = os.path.join(directory, name, "job.json")
+        if not os.path.exists(meta_path):
+            continue
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                job = json.load(f)
+            items = []
+            for index in range(job.pop("total")):
+                with open(_item_path(directory, name, index), encoding="utf-8") as f:
+                    items.append(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"[Batch] Skipping job {name}: {e}")
+            continue
+        job["items"] = items
+        job["status"] = "running"
+        BatchScheduler._update_job_status(job)
+        jobs.append(job)
+    return jobs
+
+
+def _write_atomic(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
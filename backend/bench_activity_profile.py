@@ -0,0 +1,58 @@
+import time
+import tracemalloc
+
+from activity_profile import ActivityColumns, activity_profile, render_activity_summary
+from bench_prompt_packing import synthetic_history
+from prompt_packing import PROMPT_TOKEN_BUDGET, estimate_tokens, pack_items
+from utils import PROMPT_BODY_SHARE, generate_persona_prompt
+
+
+ABOUT = {"post_karma": 1520, "comment_karma": 48211, "total_karma": 49731, "created_utc": 1.45e9}
+
+
+def timed(fn, *args, rounds: int = 3):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == "__main__":
+    print(
+        f"{'items':>8} {'columns ms':>11} {'profile ms':>11} "
+        f"{'us/item':>8} {'peak KiB':>9} {'summary tok':>12}"
+    )
+    for count in (1_000, 10_000, 50_000, 100_000):
+        records = list(synthetic_history(count))
+
+        columns, columns_s = timed(ActivityColumns.from_records, records)
+        tracemalloc.start()
+        profile, profile_s = timed(activity_profile, columns, ABOUT)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        summary = render_activity_summary(profile)
+
+        total_s = columns_s + profile_s
+        print(
+            f"{count:>8} {columns_s * 1e3:>11.1f} {profile_s * 1e3:>11.1f} "
+            f"{total_s / count * 1e6:>8.2f} {peak / 1024:>9.0f} {estimate_tokens(summary):>12}"
+        )
+
+    # What the summary does to the prompt for a typical scrape.
+    records = list(synthetic_history(20, seed=1))
+    data = {
+        "posts": [r for r in records if r["type"] == "post"],
+        "comments": [r for r in records if r["type"] == "comment"],
+        "about": ABOUT,
+    }
+    full = pack_items(records, PROMPT_TOKEN_BUDGET)
+    reduced = pack_items(records, int(PROMPT_TOKEN_BUDGET * PROMPT_BODY_SHARE))
+    prompt = generate_persona_prompt(data)
+    print()
+    print(f"items in prompt without summary: {len(full)} ({sum(i['_tokens'] for i in full)} tokens)")
+    print(f"items in prompt with summary:    {len(reduced)} ({sum(i['_tokens'] for i in reduced)} tokens)")
+    print(f"prompt with summary:             {estimate_tokens(prompt)} tokens")
+    print()
+    print(prompt[prompt.rindex("ACTIVITY SUMMARY"):prompt.index("DATA:")])
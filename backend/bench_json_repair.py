@@ -0,0 +1,111 @@
+import json
+import re
+import time
+
+from pydantic import ValidationError
+
+from json_repair import repair_json
+from models import PersonaCore
+from utils import parse_persona_reply
+
+
+PERSONA = {
+    "introversion_extroversion": 3,
+    "intuition_sensing": 7,
+    "feeling_thinking": 6,
+    "perceiving_judging": 4,
+    "behaviors_and_habits": [
+        {"text": "Posts late at night about side projects and \"shipping\" them.", "url": "https://www.reddit.com/r/python/comments/1"},
+        {"text": "Answers beginner questions patiently.", "url": "https://www.reddit.com/r/learnpython/comments/2"},
+    ],
+    "goals_and_needs": [
+        {"text": "Wants a job where they can work remotely.", "url": "https://www.reddit.com/r/cscareerquestions/comments/3"},
+    ],
+    "frustrations": [
+        {"text": "Gets annoyed by low-effort reposts.", "url": "https://www.reddit.com/r/AskReddit/comments/4"},
+    ],
+    "motivations": [
+        {"text": "Enjoys helping others learn.", "url": "https://www.reddit.com/r/learnpython/comments/5"},
+    ],
+    "keywords": ["curious", "patient", "analytical", "reserved"],
+}
+VALID = json.dumps(PERSONA)
+PRETTY = json.dumps(PERSONA, indent=2)
+
+
+def corpus():
+    """(name, reply) pairs of the ways LLM replies tend to come back broken."""
+    yield "valid", VALID
+    yield "code fence", f"```json\n{PRETTY}\n```"
+    yield "prose around", f"Here is the persona you asked for:\n{PRETTY}\nLet me know if you need more!"
+    yield "brackets in prose", f"Here is the persona [JSON]:\n{PRETTY}"
+    yield "trailing commas", PRETTY.replace('"\n', '",\n').replace("]\n", "],\n")
+    yield "missing commas", PRETTY.replace("},\n", "}\n").replace('",\n', '"\n')
+    yield "single quotes", VALID.replace('"', "'").replace("\\'", '"')
+    yield "bare keys", re.sub(r'"(\w+)":', r"\1:", PRETTY)
+    yield "comments", PRETTY.replace('"introversion_extroversion": 3,', '"introversion_extroversion": 3, // fairly introverted')
+    yield "python literals", VALID[:-1] + ', "personality_type": None}'
+    yield "unescaped quotes", VALID.replace('\\"shipping\\"', '"shipping"')
+    yield "smart quotes", VALID.replace('"curious"', "“curious”")
+    yield "score out of range", VALID.replace('"intuition_sensing": 7', '"intuition_sensing": 12')
+    yield "five keywords", VALID.replace('"reserved"]', '"reserved", "kind"]')
+    yield "bad list entry", VALID.replace('{"text": "Answers beginner questions patiently.", ', '{"txt": "Answers beginner questions patiently.", ')
+    for cut in (0.5, 0.8, 0.9, 0.97):
+        yield f"truncated at {cut:.0%}", VALID[:int(len(VALID) * cut)]
+    yield "no json", "I'm sorry, I can't help with that."
+
+
+def old_parse(raw_text: str):
+    """The previous fence-strip + regex fallback, for comparison."""
+    raw_text = raw_text.replace("```json", "").replace("```", "").strip()
+    try:
+        return PersonaCore.model_validate_json(raw_text)
+    except ValidationError:
+        pass
+    match = re.search(r"{[\s\S]+}", raw_text)
+    if not match:
+        return None
+    raw_json = re.sub(r'"\s+"', '", "', match.group())
+    raw_json = re.sub(r",([\s*[\]}])", r"\1", raw_json)
+    try:
+        return PersonaCore.model_validate(json.loads(raw_json))
+    except (ValueError, ValidationError):
+        return None
+
+
+def timed(fn, reply, rounds=200):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn(reply)
+    return result, (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    cases = list(corpus())
+    totals = {"old": 0, "repaired": 0, "partial": 0, "old_us": 0.0, "new_us": 0.0}
+    print(f"{'case':<22} {'old':>4} {'new':>8} {'repairs':>8} {'re-ask':<40} {'old us':>8} {'new us':>8}")
+    for name, reply in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            old, old_us = timed(old_parse, reply)
+            (persona, _, invalid), new_us = timed(parse_persona_reply, reply)
+        totals["old"] += old is not None
+        totals["old_us"] += old_us
+        totals["new_us"] += new_us
+        totals["repaired"] += persona is not None
+        totals["partial"] += persona is None and len(invalid) < len(PERSONA)
+        status = "ok" if persona else ("partial" if len(invalid) < len(PERSONA) else "fail")
+        print(
+            f"{name:<22} {'ok' if old else '-':>4} {status:>8} {repair_json(reply)[1]:>8} "
+            f"{','.join(invalid)[:40]:<40} "
+            f"{old_us:>8.1f} {new_us:>8.1f}"
+        )
+
+    count = len(cases)
+    print()
+    print(f"old parser valid:        {totals['old']}/{count}")
+    print(f"repair parser valid:     {totals['repaired']}/{count}")
+    print(f"partial (field re-ask):  {totals['partial']}/{count}")
+    print(f"mean parse time:         old {totals['old_us'] / count:.1f} us, new {totals['new_us'] / count:.1f} us")
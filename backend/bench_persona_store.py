@@ -0,0 +1,83 @@
+"""
+Persona store benchmark: bulk load, reopen, and /personas/similar-style
+queries over synthetic personas, in memory and memory-mapped.
+
+    python bench_persona_store.py --rows 1000000
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from persona_store import TRAIT_FIELDS, PersonaStore, keyword_vector
+
+
+KEYWORDS = [
+    "curious", "patient", "analytical", "reserved", "witty", "kind", "blunt", "creative",
+    "anxious", "driven", "sarcastic", "empathetic", "skeptical", "playful", "stubborn", "calm",
+]
+
+
+def synthetic_rows(count: int, keyword_dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.zeros((count, len(TRAIT_FIELDS) + keyword_dim), dtype=np.uint8)
+    rows[:, : len(TRAIT_FIELDS)] = rng.integers(1, 11, size=(count, len(TRAIT_FIELDS)))
+    vectors = np.stack([keyword_vector([word], keyword_dim) for word in KEYWORDS])
+    picks = rng.integers(0, len(KEYWORDS), size=(count, 4))
+    rows[:, len(TRAIT_FIELDS):] = vectors[picks].sum(axis=1)
+    return rows
+
+
+def bench(directory: str, rows: np.ndarray, mmap: bool, queries: int, k: int) -> None:
+    label = "mmap" if mmap else "memory"
+    store = PersonaStore(directory, mmap=mmap)
+    if store.count < len(rows):
+        start = time.perf_counter()
+        step = 100_000
+        for offset in range(0, len(rows), step):
+            names = [f"user_{i}" for i in range(offset, min(offset + step, len(rows)))]
+            store.add_rows(names, rows[offset:offset + len(names)])
+        print(f"{label:>6}: loaded {len(rows):,} rows in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    store = PersonaStore(directory, mmap=mmap)
+    reopen = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    latencies = []
+    for i in rng.integers(0, len(rows), size=queries):
+        start = time.perf_counter()
+        results = store.similar(rows[i], k, exclude=f"user_{i}")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    # The top hit must match a brute-force scan.
+    query = rows[0]
+    traits = rows[:, : len(TRAIT_FIELDS)].astype(np.float32)
+    expected = np.sqrt(np.square(traits - query[: len(TRAIT_FIELDS)]).sum(axis=1))
+    top = store.similar(query, 1, keyword_weight=0.0)[0]
+    assert np.isclose(1 - expected.min() / np.sqrt(4 * 81), top["score"], atol=1e-3)
+
+    print(
+        f"{label:>6}: reopen {reopen * 1000:.1f} ms, query p50 {latencies[len(latencies) // 2] * 1000:.1f} ms "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms (k={k}, {len(results)} results), "
+        f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persona store benchmark.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows, PersonaStore.__init__.__defaults__[1])
+    with tempfile.TemporaryDirectory() as directory:
+        bench(os.path.join(directory, "memory"), rows, mmap=False, queries=args.queries, k=args.k)
+        bench(os.path.join(directory, "mmap"), rows, mmap=True, queries=args.queries, k=args.k)
+        size = os.path.getsize(os.path.join(directory, "mmap", os.listdir(os.path.join(directory, "mmap"))[0]))
+        print(f"matrix file: {size / 2**20:.1f} MB for {args.rows:,} personas")
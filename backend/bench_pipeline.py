@@ -0,0 +1,207 @@
+"""
+Offline load benchmark for /scrape and /generate_persona.
+
+Starts the bench_server stand-in and the app under uvicorn, both local, then
+measures throughput and p50/p95/p99 latency at each concurrency level and
+writes a JSON report. Nothing here talks to Reddit or OpenRouter.
+
+    python bench_pipeline.py --concurrency 1,8,32 --requests 64 --output report.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+from bench_server import StandInConfig, start_stand_in, stand_in_env
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(ordered, 0.50)),
+            "p95": ms(percentile(ordered, 0.95)),
+            "p99": ms(percentile(ordered, 0.99)),
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "max": ms(ordered[-1]) if ordered else 0.0,
+        },
+    }
+
+
+async def run_level(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> Dict:
+    """Sends `total` requests with at most `concurrency` in flight."""
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port: int):
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def stage_summary() -> Dict:
+    from telemetry import STAGE_SECONDS
+
+    return {
+        f"{stage}:{status}": {
+            "count": int(values["count"]),
+            "mean_ms": round(values["sum"] / values["count"] * 1000, 2) if values["count"] else 0.0,
+        }
+        for (stage, status), values in sorted(STAGE_SECONDS.snapshot().items())
+    }
+
+
+async def benchmark(args, base_url: str) -> Dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        # One scrape to get a realistic /generate_persona payload.
+        sample = (await client.post("/scrape", json={"username": "bench_user"})).json()
+
+        run_id = int(time.time())
+        user_ids = itertools.count()
+        endpoints = {
+            # Distinct usernames so every request is a scrape-cache miss.
+            "scrape": lambda c, i: c.post(
+                "/scrape", json={"username": f"u{run_id}_{next(user_ids)}"}
+            ),
+            "generate_persona": lambda c, i: c.post(
+                "/generate_persona", params={"use_cache": "false"}, json=sample
+            ),
+        }
+
+        results = []
+        for name in args.endpoints:
+            for concurrency in args.concurrency:
+                summary = await run_level(client, endpoints[name], args.requests, concurrency)
+                results.append({"endpoint": name, "concurrency": concurrency, **summary})
+                print(
+                    f"{name:<17} c={concurrency:<4} {summary['throughput_rps']:>8.1f} rps  "
+                    f"p50 {summary['latency_ms']['p50']:>8.1f}  p95 {summary['latency_ms']['p95']:>8.1f}  "
+                    f"p99 {summary['latency_ms']['p99']:>8.1f} ms  errors {summary['errors']}"
+                )
+        return {"results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /scrape and /generate_persona benchmark.")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per level")
+    parser.add_argument("--endpoints", default="scrape,generate_persona")
+    parser.add_argument("--reddit-latency", type=float, default=0.02)
+    parser.add_argument("--listing-failure-rate", type=float, default=0.0)
+    parser.add_argument("--reddit-quota", type=int, default=0, help="Reddit requests allowed per minute, 0 for none")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_report.json")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.endpoints = [e.strip() for e in args.endpoints.split(",")]
+
+    config = StandInConfig(
+        reddit_latency=args.reddit_latency,
+        listing_failure_rate=args.listing_failure_rate,
+        reddit_quota=args.reddit_quota,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        llm_failure_rate=args.llm_failure_rate,
+        llm_malformed_rate=args.llm_malformed_rate,
+        seed=args.seed,
+    )
+    stand_in = start_stand_in(config)
+
+    # The app reads its endpoints and cache location at import time, so the
+    # environment has to be in place before main is imported.
+    os.environ.update(stand_in_env(stand_in.base_url))
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_cache_")
+    port = free_port()
+    server = start_app(port)
+
+    try:
+        report = asyncio.run(benchmark(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.should_exit = True
+        stand_in.shutdown()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests_per_level": args.requests,
+            "stand_in": vars(config),
+            "llm_hedge": os.getenv("LLM_HEDGE", "1") == "1",
+        },
+        **report,
+        "stages": stage_summary(),
+        "stand_in_requests": dict(stand_in.requests),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
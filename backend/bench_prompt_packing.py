@@ -0,0 +1,44 @@
+import random
+import time
+import tracemalloc
+
+from prompt_packing import pack_items, render_items
+
+
+SUBREDDITS = ["python", "AskReddit", "gaming", "science", "cooking", "fitness", "news", "books"]
+WORDS = "the a reddit user thinks about code games food travel work life people really".split()
+
+
+def synthetic_history(count: int, seed: int = 0):
+    """Yields `count` fake posts/comments without materializing the list."""
+    rng = random.Random(seed)
+    now = time.time()
+    corpus = " ".join(rng.choice(WORDS) for _ in range(50_000))
+    for i in range(count):
+        start = rng.randrange(0, len(corpus) - 2000)
+        body = corpus[start:start + rng.randint(20, 2000)]
+        # Sprinkle in reposts so dedupe has something to do.
+        if i % 10 == 0:
+            body = "Same copy-pasted comment!"
+        yield {
+            "type": "comment" if i % 3 else "post",
+            "title": None if i % 3 else f"Post {i}",
+            "body": body,
+            "subreddit": rng.choice(SUBREDDITS),
+            "created_utc": now - rng.uniform(0, 3 * 365 * 86400),
+            "url": f"https://www.reddit.com/r/x/comments/{i}",
+        }
+
+
+if __name__ == "__main__":
+    print(f"{'items':>8} {'seconds':>8} {'us/item':>8} {'peak KiB':>9} {'packed':>7} {'prompt chars':>13}")
+    for count in (1_000, 10_000, 100_000):
+        tracemalloc.start()
+        start = time.perf_counter()
+        # An explicit reference time keeps the stream from being materialized.
+        packed = pack_items(synthetic_history(count), reference_time=time.time())
+        text = render_items(packed)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{count:>8} {elapsed:>8.2f} {elapsed / count * 1e6:>8.1f} {peak / 1024:>9.0f} {len(packed):>7} {len(text):>13}")
@@ -0,0 +1,305 @@
+# bench_server.py
+"""
+Local stand-in for Reddit and OpenRouter, for offline benchmarks.
+
+Replays the recorded responses in bench_fixtures/ for any username:
+about.json, the JSON listings, the PRAW OAuth listings, and the
+two old.reddit HTML pages Selenium reads. It also fakes OpenRouter's
+/chat/completions, both plain and streamed, with configurable latency
+and failure injection. Point the app at it with the base-URL variables
+from stand_in_env().
+
+    python bench_server.py                   # serve on :8765
+    python bench_server.py --record kojied   # refresh fixtures from live Reddit
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+FIXTURE_USER = "bench_user"
+
+_USER_PATH_RE = re.compile(r"^/user/([^/]+)(?:/([a-z_]+?)(?:\.json)?)?/?$")
+
+
+@dataclass
+class StandInConfig:
+    reddit_latency: float = 0.02
+    listing_failure_rate: float = 0.0
+    llm_latency: float = 0.3
+    llm_jitter: float = 0.1
+    llm_failure_rate: float = 0.0
+    llm_malformed_rate: float = 0.0
+    # Requests allowed per reddit_window seconds, reported in X-Ratelimit
+    # headers and enforced with 429s. 0 disables both.
+    reddit_quota: int = 0
+    reddit_window: float = 60.0
+    seed: int = 0
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[str, str]:
+    fixtures = {}
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.quota_headers = None
+        path = urlparse(self.path).path
+        match = _USER_PATH_RE.match(path)
+        if not match:
+            return self.send_body(404, b'{"error": 404}')
+        username, listing = match.groups()
+
+        self.server.pause(self.server.config.reddit_latency)
+        self.quota_headers = self.server.take_quota()
+        if self.quota_headers is not None and self.quota_headers["X-Ratelimit-Remaining"] < 0:
+            self.server.count("throttled")
+            return self.send_body(429, b'{"error": 429}')
+        if listing == "about":
+            self.server.count("about")
+            return self.send_fixture("about.json", username)
+        if listing in ("overview", "submitted", "comments"):
+            # Paths without .json are PRAW's OAuth listing calls.
+            route = "praw" if not path.endswith(".json") else "listing"
+            self.server.count(route)
+            if route == "listing" and self.server.roll(self.server.config.listing_failure_rate):
+                return self.send_body(503, b'{"error": 503}')
+            return self.send_listing(f"{listing}.json", username, parse_qs(urlparse(self.path).query))
+        if listing is None:
+            self.server.count("html")
+            # The old.reddit profile is two pages; the first links to the second.
+            page = "user_page2.html" if "after=" in urlparse(self.path).query else "user.html"
+            return self.send_fixture(page, username, "text/html; charset=utf-8")
+        return self.send_body(404, b'{"error": 404}')
+
+    def do_POST(self):
+        self.quota_headers = None
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if path.endswith("/access_token"):
+            self.server.count("token")
+            token = {"access_token": "bench", "token_type": "bearer", "expires_in": 3600, "scope": "*"}
+            return self.send_body(200, json.dumps(token).encode())
+
+        if path.endswith("/chat/completions"):
+            self.server.count("llm")
+            request = json.loads(body or b"{}")
+            config = self.server.config
+            self.server.pause(max(0.0, config.llm_latency + self.server.jitter(config.llm_jitter)))
+            if self.server.roll(config.llm_failure_rate):
+                return self.send_body(503, b'{"error": {"message": "overloaded"}}')
+            reply = self.server.persona_reply(request)
+            if request.get("stream"):
+                return self.send_stream(reply)
+            completion = {
+                "choices": [{"message": {"role": "assistant", "content": reply}}],
+                "usage": {"prompt_tokens": sum(len(m["content"]) for m in request["messages"]) // 4},
+            }
+            return self.send_body(200, json.dumps(completion).encode())
+
+        self.send_body(404, b'{"error": 404}')
+
+    def send_fixture(self, name: str, username: str, content_type: str = "application/json"):
+        text = self.server.fixtures[name].replace(FIXTURE_USER, username)
+        self.send_body(200, text.encode("utf-8"), content_type)
+
+    def send_listing(self, name: str, username: str, query: Dict[str, List[str]]):
+        """A listing fixture paged like Reddit's: limit, and after/before cursors."""
+        listing = json.loads(self.server.fixtures[name].replace(FIXTURE_USER, username))
+        children = listing["data"]["children"]
+        names = [child["data"]["name"] for child in children]
+        limit = int(query.get("limit", ["25"])[0])
+        start, end = 0, len(children)
+        if "after" in query:
+            start = names.index(query["after"][0]) + 1 if query["after"][0] in names else end
+        elif "before" in query:
+            end = names.index(query["before"][0]) if query["before"][0] in names else 0
+            start = max(0, end - limit)
+        page = children[start:min(end, start + limit)]
+        listing["data"].update(
+            children=page,
+            dist=len(page),
+            after=page[-1]["data"]["name"] if page and start + len(page) < len(children) else None,
+            before=page[0]["data"]["name"] if page and start > 0 else None,
+        )
+        self.send_body(200, json.dumps(listing).encode("utf-8"))
+
+    def send_body(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (self.quota_headers or {}).items():
+            self.send_header(name, str(max(0, value)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, reply: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(reply), 40):
+            delta = {"choices": [{"delta": {"content": reply[i:i + 40]}}]}
+            self.write_chunk(f"data: {json.dumps(delta)}\n\n".encode())
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: StandInConfig, fixtures: Dict[str, str]):
+        super().__init__(address, StandInHandler)
+        self.config = config
+        self.fixtures = fixtures
+        self.requests = Counter()
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_used = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] += 1
+
+    def take_quota(self) -> Optional[Dict[str, float]]:
+        """Counts one Reddit request against the quota; returns its rate-limit headers."""
+        quota, window = self.config.reddit_quota, self.config.reddit_window
+        if not quota:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= window:
+                self._window_start, self._window_used = now, 0
+            self._window_used += 1
+            return {
+                "X-Ratelimit-Used": self._window_used,
+                "X-Ratelimit-Remaining": quota - self._window_used,
+                "X-Ratelimit-Reset": round(window - (now - self._window_start)),
+            }
+
+    def roll(self, rate: float) -> bool:
+        with self._lock:
+            return self._rng.random() < rate
+
+    def jitter(self, spread: float) -> float:
+        with self._lock:
+            return self._rng.uniform(-spread, spread)
+
+    @staticmethod
+    def pause(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def persona_reply(self, request: dict) -> str:
+        persona = json.loads(self.fixtures["persona.json"])
+        schema = request.get("response_format", {}).get("json_schema", {}).get("schema", {})
+        fields = schema.get("properties")
+        if fields and len(fields) < len(persona):
+            # A field re-ask: answer with just the requested fields.
+            persona = {name: persona[name] for name in fields if name in persona}
+        reply = json.dumps(persona)
+        if self.roll(self.config.llm_malformed_rate):
+            # The usual breakage: a code fence, a trailing comma, and a cut-off end.
+            reply = "```json\n" + reply.replace('"],', '"],,')[:-40]
+        return reply
+
+
+def start_stand_in(
+    config: Optional[StandInConfig] = None, port: int = 0, fixtures_dir: str = FIXTURES_DIR
+) -> StandInServer:
+    """Starts the stand-in on a background thread and returns the server."""
+    server = StandInServer(("127.0.0.1", port), config or StandInConfig(), load_fixtures(fixtures_dir))
+    threading.Thread(target=server.serve_forever, name="stand-in", daemon=True).start()
+    return server
+
+
+def stand_in_env(base_url: str) -> Dict[str, str]:
+    """Environment that points the scrapers, PRAW and the LLM client at the stand-in."""
+    return {
+        "REDDIT_JSON_BASE": base_url,
+        "REDDIT_ABOUT_BASE": base_url,
+        "OLD_REDDIT_BASE": base_url,
+        "OPENROUTER_BASE_URL": f"{base_url}/api/v1",
+        "REDDIT_OAUTH_URL": base_url,
+        "REDDIT_URL": base_url,
+        "REDDIT_CLIENT_ID": "bench",
+        "REDDIT_CLIENT_SECRET": "bench",
+        "REDDIT_USER_AGENT": "bench",
+        "OPENROUTER_KEY": "bench",
+        # Let the stand-in's quota headers, not Reddit's defaults, set the pace.
+        "REDDIT_JSON_QPM": "60000",
+        "REDDIT_OAUTH_QPM": "60000",
+        "REDDIT_HTML_QPM": "60000",
+    }
+
+
+def record_fixtures(username: str, directory: str = FIXTURES_DIR) -> None:
+    """Overwrites the JSON fixtures with a live user's responses, renamed to bench_user."""
+    import requests
+
+    session = requests.Session()
+    session.headers["User-Agent"] = os.getenv("REDDIT_USER_AGENT") or "Mozilla/5.0"
+    sources = {
+        "about.json": f"https://www.reddit.com/user/{username}/about.json",
+        "overview.json": f"https://old.reddit.com/user/{username}/overview.json?limit=100&raw_json=1",
+        "submitted.json": f"https://old.reddit.com/user/{username}/submitted.json?limit=100&raw_json=1",
+        "comments.json": f"https://old.reddit.com/user/{username}/comments.json?limit=100&raw_json=1",
+    }
+    for name, url in sources.items():
+        resp = session.get(url, timeout=15)
+        resp.raise_for_status()
+        text = json.dumps(resp.json(), indent=1).replace(username, FIXTURE_USER)
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Recorded {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--record", metavar="USERNAME")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+    else:
+        server = start_stand_in(
+            StandInConfig(llm_latency=args.llm_latency, llm_failure_rate=args.llm_failure_rate),
+            port=args.port,
+        )
+        print(f"Stand-in serving on {server.base_url}")
+        for name, value in stand_in_env(server.base_url).items():
+            print(f"export {name}={value}")
+        threading.Event().wait()
@@ -0,0 +1,152 @@
+"""
+Cold-start benchmark for a backend worker.
+
+Each run starts a fresh interpreter, so nothing is shared between runs:
+
+- import: time to `import main`, the worker's RSS afterwards, and whether
+  the heavy optional modules (praw, selenium) were pulled in.
+- serve: time from launching uvicorn until /ready answers, then until
+  /ready?require=praw does, with the worker's RSS at that point.
+
+    python bench_startup.py --runs 5 --output startup_report.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from bench_pipeline import free_port, git_commit
+
+
+HEAVY_MODULES = ("praw", "prawcore", "selenium")
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "modules": len(sys.modules),
+    "heavy_loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def worker_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Placeholder credentials so PRAW can be built; nothing here hits Reddit.
+    env.setdefault("REDDIT_CLIENT_ID", "bench")
+    env.setdefault("REDDIT_CLIENT_SECRET", "bench")
+    env.setdefault("REDDIT_USER_AGENT", "bench_startup")
+    env.setdefault("OPENROUTER_KEY", "bench")
+    return env
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+
+
+def measure_import() -> Dict:
+    out = subprocess.check_output(
+        [sys.executable, "-c", _IMPORT_PROBE], cwd=BACKEND_DIR, env=worker_env(), text=True
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def wait_until(url: str, deadline: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not ready after {deadline}s")
+
+
+def measure_serve(timeout: float) -> Dict:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=worker_env(),
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until(f"{base}/ready", timeout)
+        first_ready = time.perf_counter() - start
+        wait_until(f"{base}/ready?require=praw", timeout)
+        praw_ready = time.perf_counter() - start
+        return {
+            "ready_seconds": first_ready,
+            "praw_ready_seconds": praw_ready,
+            "rss_mb": rss_mb(proc.pid) if os.path.exists(f"/proc/{proc.pid}/status") else None,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def summarize(values: List[float]) -> Dict:
+    values = [v for v in values if v is not None]
+    if not values:
+        return {}
+    return {
+        "median": round(statistics.median(values), 4),
+        "min": round(min(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="startup_report.json")
+    args = parser.parse_args()
+
+    imports, serves = [], []
+    for i in range(args.runs):
+        imports.append(measure_import())
+        serves.append(measure_serve(args.timeout))
+        print(
+            f"run {i + 1}: import {imports[-1]['import_seconds']:.3f}s "
+            f"rss {imports[-1]['rss_mb']:.1f} MB  ready {serves[-1]['ready_seconds']:.3f}s  "
+            f"praw ready {serves[-1]['praw_ready_seconds']:.3f}s  "
+            f"heavy at import: {', '.join(imports[-1]['heavy_loaded']) or 'none'}"
+        )
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_seconds": summarize([r["import_seconds"] for r in imports]),
+        "import_rss_mb": summarize([r["rss_mb"] for r in imports]),
+        "modules_at_import": summarize([r["modules"] for r in imports]),
+        "heavy_loaded_at_import": sorted({m for r in imports for m in r["heavy_loaded"]}),
+        "ready_seconds": summarize([r["ready_seconds"] for r in serves]),
+        "praw_ready_seconds": summarize([r["praw_ready_seconds"] for r in serves]),
+        "worker_rss_mb": summarize([r["rss_mb"] for r in serves]),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# driver_pool.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+class DriverPool:
+    """
+    Bounded pool of warm Selenium drivers.
+
+    Scrapes lease a driver instead of launching Chrome themselves. Drivers are
+    reset between leases and recycled after `max_uses` leases or as soon as
+    they stop responding, so the number of Chrome processes never exceeds
+    `max_size`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        max_size: int = 2,
+        max_uses: int = 50,
+        lease_timeout: float = 60.0,
+    ):
+        self._factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+
+        self._cond = threading.Condition()
+        self._idle: List = []
+        self._uses: Dict[int, int] = {}
+        self._live = 0
+        self._closed = False
+
+        self._leases = 0
+        self._created = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def warm_up(self, count: int) -> None:
+        """Starts up to `count` drivers ahead of the first lease."""
+        for _ in range(min(count, self.max_size)):
+            with self._cond:
+                if self._live >= self.max_size:
+                    return
+                self._live += 1
+            driver = self._create()
+            if driver is None:
+                return
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        driver = self._acquire(self.lease_timeout if timeout is None else timeout)
+        try:
+            yield driver
+        finally:
+            self._release(driver)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "size": self._live,
+                "idle": len(self._idle),
+                "in_use": self._live - len(self._idle),
+                "max_size": self.max_size,
+                "leases": self._leases,
+                "created": self._created,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+                "wait_avg_seconds": self._wait_total / self._leases if self._leases else 0.0,
+                "wait_max_seconds": self._wait_max,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for driver in idle:
+            self._quit(driver)
+
+    def _acquire(self, timeout: float):
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._live < self.max_size:
+                    self._live += 1
+                    driver = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No Selenium driver free within {timeout:.0f}s")
+                self._cond.wait(remaining)
+
+        if driver is None:
+            driver = self._create(raise_errors=True)
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._leases += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return driver
+
+    def _create(self, raise_errors: bool = False):
+        try:
+            driver = self._factory()
+        except Exception as e:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            logging.error(f"[DriverPool] Failed to start driver: {e}")
+            if raise_errors:
+                raise
+            return None
+
+        with self._cond:
+            self._created += 1
+            self._uses[id(driver)] = 0
+        logging.info("[DriverPool] Started new driver.")
+        return driver
+
+    def _release(self, driver) -> None:
+        uses = self._uses.get(id(driver), 0) + 1
+        self._uses[id(driver)] = uses
+
+        if self._closed or uses >= self.max_uses:
+            self._discard(driver, crashed=False)
+            return
+        if not self._reset(driver):
+            self._discard(driver, crashed=True)
+            return
+
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def _reset(self, driver) -> bool:
+        """Clears per-scrape state. Returns False if the driver is dead."""
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+            )
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logging.warning(f"[DriverPool] Driver failed reset, recycling: {e}")
+            return False
+
+    def _discard(self, driver, crashed: bool) -> None:
+        self._uses.pop(id(driver), None)
+        self._quit(driver)
+        with self._cond:
+            self._live -= 1
+            if crashed:
+                self._crashed += 1
+            else:
+                self._recycled += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _quit(driver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"[DriverPool] Error quitting driver: {e}")
@@ -0,0 +1,289 @@
+# history_store.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from items import dumps_bytes, loads
+from json_scraper import iter_listing, to_record
+from reddit_scraper import HISTORY_DEPTH, fetch_about_metadata, fetch_user_data, reddit_api
+from scrape_cache import FIELD_TTLS
+from telemetry import FALLBACKS, span
+
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+MAX_NEW_ITEMS = int(os.getenv("REFRESH_MAX_NEW_ITEMS", "500"))
+# Size of the first page when checking an empty `before` page against the
+# mark. Usually nothing is new, and the first item already is the mark.
+REFRESH_PROBE_ITEMS = int(os.getenv("REFRESH_PROBE_ITEMS", "5"))
+
+
+class HistoryStore:
+    """
+    Persisted per-user history of scraped items with a high-water mark: the
+    newest fullname and created_utc seen for the user. Refreshes ask Reddit
+    only for items newer than the mark and merge them in. The last persona
+    generated for the user is kept with the mark it was built from.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history_items (
+                username TEXT NOT NULL,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fullname TEXT,
+                created_utc REAL,
+                record BLOB NOT NULL,
+                PRIMARY KEY (username, url)
+            );
+            CREATE INDEX IF NOT EXISTS history_items_newest
+                ON history_items (username, kind, created_utc DESC);
+            CREATE TABLE IF NOT EXISTS history_users (
+                username TEXT PRIMARY KEY,
+                newest_fullname TEXT,
+                newest_created_utc REAL,
+                profile BLOB,
+                profile_fetched_at REAL,
+                persona BLOB,
+                persona_fullname TEXT
+            );
+            """
+        )
+        self._db.commit()
+
+    def mark(self, username: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT newest_fullname, newest_created_utc FROM history_users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return {"fullname": row[0], "created_utc": row[1]}
+
+    def add_items(self, username: str, records: Iterable[Dict]) -> int:
+        """Stores records not seen before and advances the mark. Returns the count added."""
+        added = 0
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO history_users (username) VALUES (?)", (username,)
+            )
+            for record in records:
+                if not record.get("url"):
+                    continue
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO history_items "
+                    "(username, url, kind, fullname, created_utc, record) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        username,
+                        record["url"],
+                        record.get("type", "comment"),
+                        record.get("fullname"),
+                        record.get("created_utc"),
+                        dumps_bytes(record),
+                    ),
+                )
+                added += cursor.rowcount
+
+            newest = self._db.execute(
+                "SELECT fullname, created_utc FROM history_items "
+                "WHERE username = ? AND fullname IS NOT NULL "
+                "ORDER BY created_utc DESC LIMIT 1",
+                (username,),
+            ).fetchone()
+            if newest:
+                self._db.execute(
+                    "UPDATE history_users SET newest_fullname = ?, newest_created_utc = ? "
+                    "WHERE username = ?",
+                    (newest[0], newest[1], username),
+                )
+            self._db.commit()
+        return added
+
+    def has_item(self, username: str, url: Optional[str]) -> bool:
+        if not url:
+            return False
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM history_items WHERE username = ? AND url = ?", (username, url)
+            ).fetchone() is not None
+
+    def history(self, username: str, limit: int = HISTORY_DEPTH) -> Dict[str, List[Dict]]:
+        result = {}
+        with self._lock:
+            for kind, key in (("post", "posts"), ("comment", "comments")):
+                rows = self._db.execute(
+                    "SELECT record FROM history_items WHERE username = ? AND kind = ? "
+                    "ORDER BY created_utc DESC LIMIT ?",
+                    (username, kind, limit),
+                ).fetchall()
+                result[key] = [loads(row[0]) for row in rows]
+        return result
+
+    def items_since(self, username: str, fullname: Optional[str], limit: int) -> Dict[str, List[Dict]]:
+        """Posts and comments newer than the item `fullname`, newest first."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created_utc FROM history_items WHERE username = ? AND fullname = ?",
+                (username, fullname),
+            ).fetchone()
+            since = row[0] if row and row[0] is not None else 0
+            rows = self._db.execute(
+                "SELECT kind, record FROM history_items WHERE username = ? AND created_utc > ? "
+                "ORDER BY created_utc DESC LIMIT ?",
+                (username, since, limit),
+            ).fetchall()
+        result = {"posts": [], "comments": []}
+        for kind, record in rows:
+            result["posts" if kind == "post" else "comments"].append(loads(record))
+        return result
+
+    def profile(self, username: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT profile, profile_fetched_at FROM history_users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return {"data": loads(row[0]), "fetched_at": row[1]}
+
+    def save_profile(self, username: str, profile: Dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO history_users (username) VALUES (?)", (username,)
+            )
+            self._db.execute(
+                "UPDATE history_users SET profile = ?, profile_fetched_at = ? WHERE username = ?",
+                (dumps_bytes(profile), time.time(), username),
+            )
+            self._db.commit()
+
+    def persona(self, username: str) -> Optional[Dict]:
+        """The last stored persona and the mark it was generated from."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT persona, persona_fullname FROM history_users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return {"persona": loads(row[0]), "fullname": row[1]}
+
+    def save_persona(self, username: str, persona: Dict, fullname: Optional[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE history_users SET persona = ?, persona_fullname = ? WHERE username = ?",
+                (dumps_bytes(persona), fullname, username),
+            )
+            self._db.commit()
+
+
+history_store = HistoryStore(os.path.join(CACHE_DIR, "history.sqlite3"))
+
+
+def _praw_record(thing) -> Dict:
+    is_post = thing.fullname.startswith("t3_")
+    return {
+        "type": "post" if is_post else "comment",
+        "fullname": thing.fullname,
+        "title": thing.title if is_post else None,
+        "body": thing.selftext if is_post else thing.body,
+        "subreddit": str(thing.subreddit),
+        "created_utc": thing.created_utc,
+        "url": f"https://www.reddit.com{thing.permalink}",
+    }
+
+
+def _until_mark(records: Iterable[Dict], key: str, mark: Dict) -> Iterator[Dict]:
+    """Yields newest-first records until the first one at or before `mark`."""
+    for record in records:
+        created = record.get("created_utc")
+        if created is not None and mark["created_utc"] is not None and created <= mark["created_utc"]:
+            return
+        if record.get("fullname") == mark["fullname"] or history_store.has_item(key, record.get("url")):
+            return
+        yield record
+
+
+def fetch_newer_records(username: str, mark: Dict) -> List[Dict]:
+    """
+    Fetches only the posts and comments newer than `mark`. Tries the overview
+    listing's `before` cursor first. Reddit answers `before` with an empty
+    page both when nothing is new and when the mark's item was deleted or
+    removed, so an empty page is checked by walking the listing newest-first
+    down to the first item already stored. That walk starts with a small
+    page and only pages further while every item is newer than the mark.
+    PRAW, the fallback, always walks.
+    """
+    key = username.lower()
+    try:
+        with span("refresh_listing", username=username):
+            records = [
+                record
+                for record in map(to_record, iter_listing(
+                    username, "overview", MAX_NEW_ITEMS, before=mark["fullname"]
+                ))
+                if record is not None
+            ]
+            if records:
+                return records
+            newest_first = filter(None, map(to_record, iter_listing(
+                username, "overview", MAX_NEW_ITEMS, first_page=REFRESH_PROBE_ITEMS
+            )))
+            return list(_until_mark(newest_first, key, mark))
+    except Exception as e:
+        logging.warning(f"[Refresh] Listing refresh failed, trying PRAW: {e}")
+        FALLBACKS.inc(kind="praw_refresh")
+
+    redditor = reddit_api.get().redditor(username)
+    with span("praw_listing", username=username):
+        return list(_until_mark(map(_praw_record, redditor.new(limit=MAX_NEW_ITEMS)), key, mark))
+
+
+def refresh_user_data(username: str) -> Dict:
+    """
+    Brings a user's stored history up to date and returns it in the
+    fetch_user_data shape, plus "new_items": how many items were added.
+    The first call for a user does a full scrape to set the mark.
+    """
+    key = username.lower()
+    mark = history_store.mark(key)
+
+    if mark is None:
+        fresh = fetch_user_data(username)
+        new_items = history_store.add_items(key, fresh["posts"] + fresh["comments"])
+        profile = {
+            k: v for k, v in fresh.items()
+            if k not in ("posts", "comments", "dropped_sources")
+        }
+        if "about" not in fresh.get("dropped_sources", []):
+            history_store.save_profile(key, profile)
+        return {**fresh, "new_items": new_items}
+
+    new_items = history_store.add_items(key, fetch_newer_records(username, mark))
+
+    stored_profile = history_store.profile(key)
+    if stored_profile and time.time() - stored_profile["fetched_at"] < FIELD_TTLS["profile"]:
+        profile = stored_profile["data"]
+    else:
+        profile = fetch_about_metadata(username)
+        if profile is not None:
+            history_store.save_profile(key, profile)
+        else:
+            profile = (stored_profile or {}).get("data", {})
+
+    logging.info(f"[Refresh] {username}: {new_items} new items since {mark['fullname']}")
+    return {
+        **profile,
+        **history_store.history(key),
+        "dropped_sources": [],
+        "new_items": new_items,
+    }
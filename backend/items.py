@@ -0,0 +1,27 @@
+# items.py
+import json
+import sys
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serializes straight to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def intern_name(name: Optional[str]) -> Optional[str]:
+    """Interns subreddit names so repeated ones share one string object."""
+    return sys.intern(name) if name else name
@@ -0,0 +1,236 @@
+# json_repair.py
+import json
+import re
+from typing import Any, Optional, Tuple
+
+
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+_QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "/": "/"}
+# After a closing quote one of these must follow, otherwise the quote is
+# taken as part of the text (an unescaped quote inside a sentence).
+_AFTER_STRING = set(",:}]\n")
+# A closing quote directly followed by another complete string token means
+# a comma was left out between two values.
+_NEXT_STRING_RE = re.compile(r'"[^"\n]*"\s*[,:\]}]')
+# Whitespace plus the //, # and /* */ comments models like to add.
+_BLANK_RE = re.compile(r"(?:\s+|//[^\n]*|#[^\n]*|/\*.*?(?:\*/|\Z))*", re.S)
+_BARE_WORD_RES = {stop: re.compile(f"[^{re.escape(stop)}\\n]*") for stop in (",}]", ":")}
+# Characters a string scan has to stop at, per opening quote.
+_STRING_STOPS = {
+    opening: re.compile("[\\\\" + re.escape(closing) + ('"' if opening != "'" else "") + "]")
+    for opening, closing in _QUOTES.items()
+}
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.repairs = 0
+
+    def peek(self) -> str:
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def skip_blank(self) -> None:
+        match = _BLANK_RE.match(self.text, self.pos)
+        if match.end() != self.pos:
+            if not match.group().isspace():
+                self.repairs += 1
+            self.pos = match.end()
+
+    def value(self) -> Any:
+        self.skip_blank()
+        ch = self.peek()
+        if ch == "{":
+            return self.object()
+        if ch == "[":
+            return self.array()
+        if ch in _QUOTES:
+            return self.string()
+        match = _NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            try:
+                return int(number)
+            except ValueError:
+                return float(number)
+        return self.bare_word()
+
+    def separator(self, need_comma: bool) -> None:
+        """Consumes a comma; one where no value came before is a repair."""
+        if not need_comma:
+            self.repairs += 1
+        self.pos += 1
+
+    def object(self) -> dict:
+        self.pos += 1
+        result = {}
+        # need_comma: a member was just read; after_comma: a comma was.
+        need_comma = after_comma = False
+        while True:
+            self.skip_blank()
+            ch = self.peek()
+            if ch == "}":
+                if after_comma:
+                    self.repairs += 1
+                self.pos += 1
+                return result
+            if not ch:
+                self.repairs += 1
+                return result
+            if ch == ",":
+                self.separator(need_comma)
+                need_comma, after_comma = False, True
+                continue
+            if ch == "]":
+                # Mismatched bracket: treat it as the end of this object.
+                self.pos += 1
+                self.repairs += 1
+                return result
+            if need_comma:
+                self.repairs += 1
+            need_comma, after_comma = True, False
+
+            key = self.string() if ch in _QUOTES else self.bare_word(stop=":")
+            self.skip_blank()
+            if self.peek() == ":":
+                self.pos += 1
+            else:
+                self.repairs += 1
+            self.skip_blank()
+            if self.peek() in ("", "}", ","):
+                self.repairs += 1
+                continue
+            result[str(key)] = self.value()
+
+    def array(self) -> list:
+        self.pos += 1
+        result = []
+        need_comma = after_comma = False
+        while True:
+            self.skip_blank()
+            ch = self.peek()
+            if ch == "]":
+                if after_comma:
+                    self.repairs += 1
+                self.pos += 1
+                return result
+            if not ch:
+                self.repairs += 1
+                return result
+            if ch == ",":
+                self.separator(need_comma)
+                need_comma, after_comma = False, True
+                continue
+            if ch == "}":
+                self.pos += 1
+                self.repairs += 1
+                return result
+            if need_comma:
+                self.repairs += 1
+            need_comma, after_comma = True, False
+            start = self.pos
+            result.append(self.value())
+            if self.pos == start:
+                # Nothing consumable here; drop the character and move on.
+                self.pos += 1
+                self.repairs += 1
+
+    def string(self) -> str:
+        opening = self.peek()
+        closing = _QUOTES[opening]
+        if opening != '"':
+            self.repairs += 1
+        self.pos += 1
+        text = self.text
+        stops = _STRING_STOPS[opening]
+        chunks = []
+        start = self.pos
+        while True:
+            match = stops.search(text, self.pos)
+            if match is None:
+                break
+            self.pos = match.start()
+            ch = text[self.pos]
+            if ch == "\\" and self.pos + 1 < len(text):
+                chunks.append(text[start:self.pos])
+                escaped = text[self.pos + 1]
+                if escaped == "u" and self.pos + 6 <= len(text):
+                    try:
+                        chunks.append(chr(int(text[self.pos + 2:self.pos + 6], 16)))
+                        self.pos += 6
+                        start = self.pos
+                        continue
+                    except ValueError:
+                        pass
+                chunks.append(_ESCAPES.get(escaped, escaped))
+                self.pos += 2
+                start = self.pos
+                continue
+            if ch == closing or (ch == '"' and closing != "'"):
+                rest = self.pos + 1
+                while rest < len(text) and text[rest] in " \t\r":
+                    rest += 1
+                if (
+                    rest >= len(text)
+                    or text[rest] in _AFTER_STRING
+                    or _NEXT_STRING_RE.match(text, rest)
+                ):
+                    chunks.append(text[start:self.pos])
+                    self.pos += 1
+                    return "".join(chunks)
+                self.repairs += 1
+            self.pos += 1
+        # Unterminated: the reply was cut off mid-string.
+        self.pos = len(text)
+        self.repairs += 1
+        chunks.append(text[start:])
+        return "".join(chunks)
+
+    def bare_word(self, stop: str = ",}]") -> Any:
+        start = self.pos
+        text = self.text
+        match = _BARE_WORD_RES[stop].match(text, self.pos)
+        self.pos = match.end()
+        word = text[start:self.pos].strip()
+        if word in _LITERALS:
+            if word not in ("true", "false", "null"):
+                self.repairs += 1
+            return _LITERALS[word]
+        self.repairs += 1
+        return word
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], int]:
+    """
+    Parses JSON the way LLMs tend to get it wrong: wrapped in code fences or
+    prose, with single or curly quotes, bare keys, comments, Python
+    literals, missing or trailing commas, unescaped quotes inside strings,
+    or cut off part-way. Only the broken spots are patched; everything else
+    is read as-is.
+
+    Returns (value, repairs): the parsed object (None if the text holds
+    none) and how many fixes were applied. Parsing starts at the first "{",
+    so brackets in leading prose are skipped; a persona is always an object.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None, 0
+
+    # Fast path: valid JSON that only needs the fences or prose cut away.
+    end = text.rfind("}")
+    if end > start:
+        try:
+            return json.loads(text[start:end + 1]), 0
+        except ValueError:
+            pass
+
+    parser = _Parser(text)
+    parser.pos = start
+    return parser.value(), parser.repairs
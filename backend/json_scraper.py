@@ -0,0 +1,152 @@
+# json_scraper.py
+import logging
+import os
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from items import intern_name
+from models import RedditRecord
+from rate_limiter import reddit_limiter
+from record_stream import record_size
+from telemetry import ITEMS_SCRAPED
+
+
+REDDIT_JSON_BASE = os.getenv("REDDIT_JSON_BASE", "https://old.reddit.com")
+LISTING_TIMEOUT = float(os.getenv("LISTING_TIMEOUT", "10"))
+PAGE_SIZE = 100
+
+session = requests.Session()
+session.headers.update({"User-Agent": os.getenv("REDDIT_USER_AGENT") or "Mozilla/5.0"})
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+
+def to_record(child: Dict) -> Optional[RedditRecord]:
+    """Converts a listing child into the record shape used by scrape_with_praw."""
+    data = child.get("data", {})
+    url = f"https://www.reddit.com{data.get('permalink', '')}"
+
+    if child.get("kind") == "t3":
+        return {
+            "type": "post",
+            "fullname": data.get("name"),
+            "title": data.get("title"),
+            "body": data.get("selftext", ""),
+            "subreddit": intern_name(data.get("subreddit")),
+            "created_utc": data.get("created_utc"),
+            "url": url,
+        }
+    if child.get("kind") == "t1":
+        return {
+            "type": "comment",
+            "fullname": data.get("name"),
+            "body": data.get("body", ""),
+            "subreddit": intern_name(data.get("subreddit")),
+            "created_utc": data.get("created_utc"),
+            "url": url,
+        }
+    return None
+
+
+def iter_listing(
+    username: str,
+    listing: str,
+    max_items: int,
+    before: Optional[str] = None,
+    first_page: Optional[int] = None,
+) -> Iterator[Dict]:
+    """
+    Pages through /user/{username}/{listing}.json and yields raw listing
+    children. Normally walks back in time with `after` cursors; given a
+    `before` fullname it instead walks forward from that item, so only
+    newer items are fetched. `first_page` makes the first request smaller,
+    for callers that expect to stop within a few items. Throttled and 5xx
+    responses are retried by the shared rate limiter; raises on any other
+    non-200 response.
+    """
+    url = f"{REDDIT_JSON_BASE}/user/{username}/{listing}.json"
+    cursor_name = "before" if before else "after"
+    cursor = before
+    fetched = 0
+    page_size = first_page or PAGE_SIZE
+
+    while fetched < max_items:
+        params = {"limit": min(page_size, max_items - fetched), "raw_json": 1}
+        page_size = PAGE_SIZE
+        if cursor:
+            params[cursor_name] = cursor
+
+        resp = reddit_limiter.request(
+            "json", lambda: session.get(url, params=params, timeout=LISTING_TIMEOUT)
+        )
+        resp.raise_for_status()
+        data = resp.json().get("data", {})
+
+        children = data.get("children", [])
+        for child in children:
+            yield child
+        fetched += len(children)
+
+        cursor = data.get(cursor_name)
+        if not cursor or not children:
+            return
+
+
+def iter_json_records(username: str, listing: str, max_items: int) -> Iterator[RedditRecord]:
+    """Lazily yields records from one listing, fetching pages on demand."""
+    for child in iter_listing(username, listing, max_items):
+        record = to_record(child)
+        if record is not None:
+            yield record
+
+
+def scrape_with_json(
+    username: str, limit: int = 20, max_bytes: Optional[int] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Reads up to `limit` posts and `limit` comments (and at most `max_bytes`
+    of text per kind) from the public JSON listings without a browser.
+    overview.json covers both kinds in one pass; submitted.json and
+    comments.json only top up whichever kind is short.
+    """
+    collected = {"post": [], "comment": []}
+    sizes = {"post": 0, "comment": 0}
+    seen = set()
+
+    def wants(kind: str) -> bool:
+        return len(collected[kind]) < limit and (max_bytes is None or sizes[kind] < max_bytes)
+
+    def add(record: RedditRecord) -> None:
+        if record["url"] in seen or not wants(record["type"]):
+            return
+        seen.add(record["url"])
+        collected[record["type"]].append(record)
+        sizes[record["type"]] += record_size(record)
+
+    scanned = 0
+    for record in iter_json_records(username, "overview", limit * 2):
+        scanned += 1
+        add(record)
+        if not wants("post") and not wants("comment"):
+            break
+
+    # A short overview means the user has nothing older to top up from.
+    if scanned >= limit * 2:
+        for kind, listing in (("post", "submitted"), ("comment", "comments")):
+            if not wants(kind):
+                continue
+            for record in iter_json_records(username, listing, limit):
+                add(record)
+                if not wants(kind):
+                    break
+
+    posts, comments = collected["post"], collected["comment"]
+    logging.info(f"[JSON] Scraped {len(posts)} posts and {len(comments)} comments")
+    ITEMS_SCRAPED.inc(len(posts), source="json", kind="post")
+    ITEMS_SCRAPED.inc(len(comments), source="json", kind="comment")
+    return {
+        "username": username,
+        "posts": posts,
+        "comments": comments,
+    }
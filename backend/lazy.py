@@ -0,0 +1,67 @@
+# lazy.py
+import logging
+import threading
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+from telemetry import span
+
+
+T = TypeVar("T")
+
+
+class LazyEngine(Generic[T]):
+    """
+    A client or engine that is built on first use instead of at import, so
+    workers that never need it never pay for it. The lifespan can warm it in
+    the background, and /ready reports its state: cold, warming, ready or
+    error.
+    """
+
+    def __init__(self, name: str, build: Callable[[], T]):
+        self.name = name
+        self._build = build
+        self._value: Optional[T] = None
+        self._error: Optional[str] = None
+        self._building = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            if self._value is None:
+                self._building = True
+                try:
+                    with span("engine_init", engine=self.name):
+                        self._value = self._build()
+                    self._error = None
+                except Exception as e:
+                    self._error = repr(e)
+                    raise
+                finally:
+                    self._building = False
+        return self._value
+
+    def warm(self) -> bool:
+        """Builds the engine if needed; returns whether it is ready. Never raises."""
+        try:
+            self.get()
+            return True
+        except Exception as e:
+            logging.warning(f"[Startup] Could not warm {self.name}: {e}")
+            return False
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    def status(self) -> Dict:
+        if self._value is not None:
+            state = "ready"
+        elif self._building:
+            state = "warming"
+        elif self._error:
+            state = "error"
+        else:
+            state = "cold"
+        return {"state": state, "error": self._error} if self._error else {"state": state}
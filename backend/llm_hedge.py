@@ -0,0 +1,137 @@
+# llm_hedge.py
+import asyncio
+import bisect
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from models import PersonaCore
+from telemetry import FALLBACKS
+from utils import (
+    LLM_PROVIDERS,
+    PERSONA_SCHEMA,
+    call_provider,
+    complete_persona,
+    provider_label,
+)
+
+
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "8"))
+HEDGE_MIN_SAMPLES = 20
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = [0.5, 1, 2, 4, 8, 15, 30, 60]
+
+
+class LatencyTracker:
+    """
+    Latency histogram for one provider plus a window of recent samples. The
+    window's p95 is the hedge delay: how long to wait on this provider
+    before starting the next one.
+    """
+
+    def __init__(self, window: int = 200):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        if len(self.recent) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return self.quantile(0.95)
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum_seconds": self.total,
+            "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.buckets)),
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "hedge_delay_seconds": self.hedge_delay(),
+        }
+
+
+latency_trackers: Dict[str, LatencyTracker] = {}
+
+
+def tracker_for(provider: dict) -> LatencyTracker:
+    return latency_trackers.setdefault(provider_label(provider), LatencyTracker())
+
+
+async def _attempt(provider: dict, content: str, client: httpx.AsyncClient) -> PersonaCore:
+    start = time.monotonic()
+    raw_text = await call_provider(provider, content, client, PERSONA_SCHEMA)
+    # Only successful replies feed the histogram; errors would drag the
+    # hedge delay down and make us hedge too eagerly.
+    tracker_for(provider).observe(time.monotonic() - start)
+
+    persona = await complete_persona(provider, content, raw_text, client)
+    if persona is None:
+        raise ValueError("Response did not validate as PersonaCore")
+    return persona
+
+
+async def call_llm_hedged(
+    content: str,
+    client: httpx.AsyncClient,
+    providers: List[dict] = None,
+) -> Optional[PersonaCore]:
+    """
+    Races providers in order. The next provider starts when the running ones
+    have been silent for the current one's p95 latency, or as soon as one
+    fails. The first response that validates wins and the rest are
+    cancelled. Returns None if every provider fails.
+    """
+    pending_providers = list(providers or LLM_PROVIDERS)
+    running = {}
+
+    def launch():
+        provider = pending_providers.pop(0)
+        task = asyncio.create_task(_attempt(provider, content, client))
+        running[task] = provider
+        return provider
+
+    try:
+        delay = tracker_for(launch()).hedge_delay()
+        while running:
+            timeout = delay if pending_providers else None
+            done, _ = await asyncio.wait(
+                running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                provider = launch()
+                print(f"Hedging with {provider_label(provider)}", flush=True)
+                FALLBACKS.inc(kind="llm_hedge")
+                delay = tracker_for(provider).hedge_delay()
+                continue
+
+            for task in done:
+                provider = running.pop(task)
+                if task.exception() is None:
+                    return task.result()
+                print(f"{provider_label(provider)} Error:", task.exception(), flush=True)
+
+            if pending_providers:
+                FALLBACKS.inc(kind="llm_provider")
+                delay = tracker_for(launch()).hedge_delay()
+        return None
+    finally:
+        for task in running:
+            task.cancel()
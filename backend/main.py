@@ -1,24 +1,115 @@
 
 # main.py
+import asyncio
+import contextvars
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
-from models import PersonaCore, ScrapeRequest, ScrapeResponse, PersonaResponse
-from reddit_scraper import extract_username, fetch_user_data
+# Load .env once, before the modules below read their settings at import.
+load_dotenv()
+
+from batch import BatchScheduler
+from history_store import history_store, refresh_user_data
+from models import (
+    BatchRequest,
+    PersonaCore,
+    PersonaResponse,
+    PersonaUpdateRequest,
+    ScrapeRequest,
+    ScrapeResponse,
+    merge_persona,
+)
+from json_scraper import session as reddit_session
+from reddit_scraper import extract_username, reddit_api, selenium_pool
+from lazy import LazyEngine
+from persona_cache import CACHE_DIR, persona_cache, persona_cache_key
+from rate_limiter import reddit_limiter
+from scrape_cache import cached_fetch_user_data, scrape_cache
+from stream_parser import SectionParser
+from telemetry import FALLBACKS, record_span, recent_traces, render_metrics, span
+from items import dumps_bytes
+from llm_hedge import call_llm_hedged, latency_trackers
 from utils import (
-    call_llm_with_fallback,
-    extract_json_loose,
+    ACTIVITY_HISTORY_ITEMS,
+    ACTIVITY_SUMMARY,
+    LLM_PROVIDERS,
+    PERSONA_SCHEMA,
+    call_persona_with_fallback,
+    complete_persona,
+    create_llm_client,
     generate_persona_prompt,
+    generate_persona_update_prompt,
+    provider_chain_id,
+    provider_label,
+    stream_provider,
 )
 
 
-load_dotenv()
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+PERSONA_STORE = os.getenv("PERSONA_STORE", "1") == "1"
+# Rounds through the LLM provider chain before a persona request fails.
+PERSONA_ATTEMPTS = 3
+# Above this many new items an incremental update isn't worth it.
+PERSONA_DELTA_MAX_ITEMS = int(os.getenv("PERSONA_DELTA_MAX_ITEMS", "25"))
+
+# Scrapes block on PRAW, Selenium and Reddit HTTP calls, so they run here
+# instead of on the event loop. The bound caps concurrent scrapes per worker.
+scrape_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SCRAPE_WORKERS", "8")),
+    thread_name_prefix="scrape",
+)
+
+
+def open_persona_store():
+    # Imported here so NumPy loads with the store, not at worker startup.
+    from persona_store import PersonaStore
+
+    return PersonaStore(
+        os.path.join(CACHE_DIR, "persona_store"),
+        mmap=os.getenv("PERSONA_STORE_MMAP", "0") == "1",
+    )
+
+
+persona_store = LazyEngine("persona_store", open_persona_store)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.llm_client = create_llm_client()
+    app.state.batch = BatchScheduler(
+        scrape=lambda username: run_batch_scrape(username),
+        persona=lambda scrape, use_cache: run_batch_persona(app, scrape, use_cache),
+    )
+    await app.state.batch.start()
+    # Optional engines warm in the background so the worker can serve
+    # requests that don't need them right away; /ready reports progress.
+    loop = asyncio.get_running_loop()
+    if os.getenv("PRAW_WARM", "1") == "1":
+        loop.run_in_executor(scrape_executor, reddit_api.warm)
+    # Off by default: warming would import NumPy in every worker at startup.
+    if PERSONA_STORE and os.getenv("PERSONA_STORE_WARM", "0") == "1":
+        loop.run_in_executor(scrape_executor, persona_store.warm)
+    warm = int(os.getenv("SELENIUM_POOL_WARM", "0"))
+    if warm:
+        loop.run_in_executor(scrape_executor, selenium_pool.warm_up, warm)
+    yield
+    await app.state.batch.stop()
+    await app.state.llm_client.aclose()
+    scrape_executor.shutdown(wait=False, cancel_futures=True)
+    selenium_pool.close()
+    reddit_session.close()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -30,80 +121,186 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with span("request", method=request.method, path=request.url.path) as attrs:
+        response = await call_next(request)
+        attrs["status_code"] = response.status_code
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces")
+def traces(limit: int = 20):
+    """The most recent traces with their stage spans, for finding slow stages."""
+    return recent_traces(limit)
+
+
+def selenium_status() -> dict:
+    pool = selenium_pool.stats()
+    if pool["idle"] or pool["leases"]:
+        state = "ready"
+    elif pool["size"]:
+        state = "warming"
+    else:
+        state = "cold"
+    return {"state": state, "drivers": pool["size"]}
+
+
+@app.get("/ready")
+def ready(require: str = ""):
+    """
+    Readiness probe. The worker can serve as soon as this answers; the
+    optional engines (PRAW, the Selenium pool) are built on first use or
+    warmed in the background, and their state is reported here. Engines
+    listed in `require` (comma-separated) must be ready, else this is a 503.
+    """
+    engines = {
+        "praw": reddit_api.status(),
+        "selenium": selenium_status(),
+        "persona_store": persona_store.status(),
+    }
+    missing = [
+        name for name in filter(None, (n.strip() for n in require.split(",")))
+        if engines.get(name, {}).get("state") != "ready"
+    ]
+    body = {"ready": not missing, "engines": engines}
+    if missing:
+        body["missing"] = missing
+    return JSONResponse(body, status_code=503 if missing else 200)
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "selenium_pool": selenium_pool.stats(),
+        "scrape_cache": scrape_cache.stats(),
+        "persona_cache": persona_cache.stats(),
+        "reddit_rate_limit": reddit_limiter.stats(),
+        "persona_store": persona_store.get().stats() if persona_store.ready else None,
+        "llm_latency": {
+            name: tracker.snapshot() for name, tracker in latency_trackers.items()
+        },
+    }
+
+
+def in_executor(fn, *args):
+    """Runs a blocking call on the scrape executor, keeping the current trace."""
+    return asyncio.get_running_loop().run_in_executor(
+        scrape_executor, contextvars.copy_context().run, fn, *args
+    )
+
+
+async def fetch_profile(username: str) -> dict:
+    result = await in_executor(cached_fetch_user_data, username)
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+    return result
+
+
+def scrape_payload(username: str, result: dict) -> dict:
+    """The ScrapeResponse fields of a fetch result, without building the model."""
+    payload = {name: result.get(name) for name in ScrapeResponse.model_fields}
+    payload["username"] = username
+    payload["posts"] = result.get("posts", [])
+    payload["comments"] = result.get("comments", [])
+    payload["dropped_sources"] = result.get("dropped_sources", [])
+    return payload
+
+
+async def scrape_profile(username: str) -> ScrapeResponse:
+    # The payload comes from our own scrapers, so it is not validated again.
+    return ScrapeResponse.model_construct(**scrape_payload(username, await fetch_profile(username)))
+
+
 @app.post("/scrape", response_model=ScrapeResponse)
-def scrape_user(data: ScrapeRequest):
+async def scrape_user(data: ScrapeRequest):
     username = extract_username(data.username)
 
     try:
-        result = fetch_user_data(username)
-        if not result:
-            raise HTTPException(status_code=404, detail="User not found")
+        result = await fetch_profile(username)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
-    return ScrapeResponse(
-        username=username,
-        profile_picture=result.get("profile_picture"),
-        snoovatar=result.get("snoovatar"),
-        comment_karma=result.get("comment_karma"),
-        post_karma=result.get("post_karma"),
-        total_karma=result.get("total_karma"),
-        created_utc=result.get("created_utc"),
-        is_mod=result.get("is_mod"),
-        is_gold=result.get("is_gold"),
-        verified=result.get("verified"),
-        has_verified_email=result.get("has_verified_email"),
-        accept_followers=result.get("accept_followers"),
-        occupation=result.get("occupation"),
-        status=result.get("status"),
-        location=result.get("location"),
-        posts=result.get("posts", []),
-        comments=result.get("comments", []),
+    # The scraped records are already plain JSON data; serialize them
+    # directly instead of validating and re-encoding them as a model.
+    return Response(
+        content=dumps_bytes(scrape_payload(username, result)),
+        media_type="application/json",
     )
 
 
-@app.post("/generate_persona", response_model=PersonaResponse)
-def generate_persona(scrape_data: ScrapeResponse):
-    for attempt in range(3):
-        try:
-            prompt = generate_persona_prompt(scrape_data.dict())
-            raw_text = call_llm_with_fallback(prompt)
+async def request_persona(prompt: str, client) -> PersonaCore | None:
+    """One round of asking the LLM chain for a persona."""
+    if LLM_HEDGE:
+        return await call_llm_hedged(prompt, client)
+    return await call_persona_with_fallback(prompt, client)
 
-            if not raw_text:
-                raise HTTPException(
-                    status_code=502, detail="LLM returned empty response"
-                )
 
-            raw_text = raw_text.replace("```json", "").replace("```", "").strip()
-            llm_data = None
+def prompt_data(scrape_data: ScrapeResponse, history: dict | None = None) -> dict:
+    """
+    What generate_persona_prompt needs from a scrape: the items, the profile
+    fields for the activity summary, and optionally the user's longer stored
+    history to compute that summary over.
+    """
+    return {
+        "posts": scrape_data.posts,
+        "comments": scrape_data.comments,
+        "about": {
+            name: getattr(scrape_data, name)
+            for name in ("post_karma", "comment_karma", "total_karma", "created_utc")
+        },
+        "history": history,
+    }
 
-            try:
-                llm_data = PersonaCore.model_validate_json(raw_text)
-                print(
-                    f"Parsed JSON directly from model output on attempt {attempt + 1}",
-                    flush=True,
-                )
-            except Exception as e:
-                print(
-                    f"Direct parse failed on attempt {attempt + 1}:", 
-                    e, 
-                    flush=True
-                )
-                loose_json = extract_json_loose(raw_text)
-                if loose_json:
-                    parsed = json.loads(loose_json)
-                    llm_data = PersonaCore.model_validate(parsed)
-                    print(
-                        f"Parsed JSON via loose fallback on attempt {attempt + 1}",
-                        flush=True,
-                    )
 
-            if llm_data:
-                llm_dict = llm_data.model_dump()
-                meta_dict = scrape_data.model_dump()
-                merged = {**meta_dict, **llm_dict}
+def store_persona(persona: PersonaResponse) -> None:
+    try:
+        persona_store.get().add(persona.username, persona)
+    except Exception as e:
+        print(f"Persona store error: {str(e)}", flush=True)
+
 
-                return PersonaResponse(**merged)
+async def remember_persona(persona: PersonaResponse) -> PersonaResponse:
+    """
+    Adds a newly generated persona to the similarity index and passes it
+    through. Cache hits skip this: their persona was stored when generated.
+    """
+    if PERSONA_STORE:
+        await asyncio.to_thread(store_persona, persona)
+    return persona
+
+
+async def build_persona(
+    scrape_data: ScrapeResponse, client, use_cache: bool = True, history: dict | None = None
+) -> PersonaResponse:
+    # The prompt build (with its activity summary over up to
+    # ACTIVITY_HISTORY_ITEMS records) and the cache's SQLite calls run off
+    # the event loop, like the scrape.
+    with span("prompt_build"):
+        prompt = await asyncio.to_thread(generate_persona_prompt, prompt_data(scrape_data, history))
+    cache_key = persona_cache_key(prompt, provider_chain_id())
+
+    if use_cache:
+        cached = await asyncio.to_thread(persona_cache.get, cache_key)
+        if cached:
+            print("Serving persona from cache", flush=True)
+            return merge_persona(scrape_data, cached)
+
+    for attempt in range(PERSONA_ATTEMPTS):
+        if attempt:
+            FALLBACKS.inc(kind="llm_retry")
+        try:
+            with span("llm_attempt", attempt=attempt + 1):
+                llm_data = await request_persona(prompt, client)
+            if llm_data:
+                print(f"Parsed persona on attempt {attempt + 1}", flush=True)
+                await asyncio.to_thread(persona_cache.put, cache_key, llm_data)
+                return await remember_persona(merge_persona(scrape_data, llm_data))
 
         except Exception as e:
             print(
@@ -112,5 +309,366 @@ def generate_persona(scrape_data: ScrapeResponse):
             )
 
     raise HTTPException(
-        status_code=500, detail="Persona generation failed after 3 attempts"
+        status_code=500, detail=f"Persona generation failed after {PERSONA_ATTEMPTS} attempts"
+    )
+
+
+async def update_persona(
+    previous: dict,
+    delta: dict,
+    profile,
+    client,
+    regenerate: Callable[[], Awaitable[PersonaResponse]],
+    use_cache: bool = True,
+) -> PersonaResponse:
+    """
+    Revises `previous` (PersonaCore fields) with only the new posts/comments
+    in `delta`, using a much smaller prompt than a full build. Falls back to
+    `regenerate` when the delta is too large or the revision doesn't
+    validate.
+    """
+    new_items = len(delta.get("posts", [])) + len(delta.get("comments", []))
+    if new_items == 0:
+        return merge_persona(profile, PersonaCore(**previous))
+    if new_items > PERSONA_DELTA_MAX_ITEMS:
+        print(f"Delta of {new_items} items is too large, regenerating", flush=True)
+        FALLBACKS.inc(kind="delta_regenerate")
+        return await regenerate()
+
+    with span("prompt_build", kind="delta"):
+        prompt = generate_persona_update_prompt(previous, delta)
+    cache_key = persona_cache_key(prompt, provider_chain_id())
+    if use_cache:
+        cached = await asyncio.to_thread(persona_cache.get, cache_key)
+        if cached:
+            return merge_persona(profile, cached)
+
+    try:
+        with span("llm_attempt", kind="delta"):
+            llm_data = await request_persona(prompt, client)
+    except Exception as e:
+        print(f"Delta update failed: {str(e)}", flush=True)
+        llm_data = None
+
+    if not llm_data:
+        print("Delta update did not validate, regenerating", flush=True)
+        FALLBACKS.inc(kind="delta_regenerate")
+        return await regenerate()
+
+    print(f"Updated persona from {new_items} new items", flush=True)
+    await asyncio.to_thread(persona_cache.put, cache_key, llm_data)
+    return await remember_persona(merge_persona(profile, llm_data))
+
+
+@app.post("/generate_persona", response_model=PersonaResponse)
+async def generate_persona(
+    scrape_data: ScrapeResponse, request: Request, use_cache: bool = True
+):
+    return await build_persona(scrape_data, request.app.state.llm_client, use_cache)
+
+
+@app.post("/generate_persona/incremental", response_model=PersonaResponse)
+async def generate_persona_incremental(
+    data: PersonaUpdateRequest, request: Request, use_cache: bool = True
+):
+    client = request.app.state.llm_client
+
+    async def regenerate():
+        scrape_data = await scrape_profile(data.previous.username)
+        return await build_persona(scrape_data, client, use_cache)
+
+    return await update_persona(
+        data.previous.model_dump(include=set(PersonaCore.model_fields)),
+        {"posts": data.posts, "comments": data.comments},
+        data.previous,
+        client,
+        regenerate,
+        use_cache,
+    )
+
+
+async def run_batch_scrape(username: str) -> dict:
+    # The raw payload goes to the job as-is; it is only ever read back by
+    # run_batch_persona, so there is no model to build and dump here.
+    username = extract_username(username)
+    return scrape_payload(username, await fetch_profile(username))
+
+
+async def run_batch_persona(app: FastAPI, scrape: dict, use_cache: bool) -> dict:
+    persona = await build_persona(
+        ScrapeResponse.model_construct(**scrape), app.state.llm_client, use_cache
+    )
+    return persona.model_dump()
+
+
+@app.post("/batch")
+async def submit_batch(data: BatchRequest, request: Request):
+    job = await request.app.state.batch.submit(data.usernames, data.use_cache)
+    return request.app.state.batch.status(job["job_id"])
+
+
+@app.get("/batch/{job_id}")
+def batch_status(job_id: str, request: Request):
+    status = request.app.state.batch.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return status
+
+
+@app.get("/batch/{job_id}/results")
+def batch_results(job_id: str, request: Request):
+    job = request.app.state.batch.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {
+        **request.app.state.batch.status(job_id),
+        "results": [
+            {
+                "username": item["username"],
+                "status": item["status"],
+                "persona": item["persona"],
+                "error": item["error"],
+            }
+            for item in job["items"]
+        ],
+    }
+
+
+@app.post("/refresh/{username:path}")
+async def refresh_persona(username: str, request: Request, use_cache: bool = True):
+    """
+    Re-scrapes a known user from their stored high-water mark, so only new
+    posts and comments are fetched. With nothing new, the stored persona is
+    returned without calling the LLM; otherwise it is revised from the new
+    items alone.
+    """
+    username = extract_username(username)
+    try:
+        result = await in_executor(refresh_user_data, username)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Refresh failed: {str(e)}")
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    scrape_data = ScrapeResponse(**scrape_payload(username, result))
+    key = username.lower()
+    mark, stored = await asyncio.to_thread(
+        lambda: (history_store.mark(key), history_store.persona(key))
     )
+
+    client = request.app.state.llm_client
+    # A full rebuild summarizes the whole stored history, not just the
+    # newest items that go into the prompt.
+    history = None
+    if ACTIVITY_SUMMARY and not (stored and result["new_items"] == 0):
+        history = await asyncio.to_thread(history_store.history, key, ACTIVITY_HISTORY_ITEMS)
+
+    if stored and result["new_items"] == 0:
+        persona = merge_persona(scrape_data, PersonaCore(**stored["persona"]))
+        reused = True
+    else:
+        if stored:
+            delta = await asyncio.to_thread(
+                history_store.items_since, key, stored["fullname"], PERSONA_DELTA_MAX_ITEMS + 1
+            )
+            persona = await update_persona(
+                stored["persona"],
+                delta,
+                scrape_data,
+                client,
+                lambda: build_persona(scrape_data, client, use_cache, history),
+                use_cache,
+            )
+        else:
+            persona = await build_persona(scrape_data, client, use_cache, history)
+        await asyncio.to_thread(
+            history_store.save_persona,
+            key,
+            persona.model_dump(include=set(PersonaCore.model_fields)),
+            mark and mark["fullname"],
+        )
+        reused = False
+
+    return {
+        "new_items": result["new_items"],
+        "reused_persona": reused,
+        "persona": persona.model_dump(),
+    }
+
+
+@app.get("/personas/similar")
+def similar_personas(
+    username: str | None = None,
+    introversion_extroversion: int | None = Query(None, ge=1, le=10),
+    intuition_sensing: int | None = Query(None, ge=1, le=10),
+    feeling_thinking: int | None = Query(None, ge=1, le=10),
+    perceiving_judging: int | None = Query(None, ge=1, le=10),
+    keywords: str = "",
+    k: int = Query(10, ge=1, le=100),
+    keyword_weight: float | None = Query(None, ge=0, le=1),
+):
+    """
+    Stored personas most like a given one, from past generations only: no
+    scraping or LLM calls. Query by a stored `username`, or by the four
+    trait scores plus optional comma-separated `keywords`.
+    """
+    if not PERSONA_STORE:
+        raise HTTPException(status_code=404, detail="Persona store is disabled")
+    store = persona_store.get()
+
+    if username:
+        username = extract_username(username)
+        query = store.row_for(username)
+        if query is None:
+            raise HTTPException(status_code=404, detail="No stored persona for this user")
+    else:
+        traits = [introversion_extroversion, intuition_sensing, feeling_thinking, perceiving_judging]
+        if None in traits:
+            raise HTTPException(
+                status_code=400,
+                detail="Give a username, or all four trait scores",
+            )
+        query = store.query_row(traits, keywords.split(","))
+
+    options = {} if keyword_weight is None else {"keyword_weight": keyword_weight}
+    with span("persona_similar", k=k, stored=store.count):
+        results = store.similar(query, k, exclude=username, **options)
+    return {"username": username, "results": results}
+
+
+def ndjson_line(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def persona_stream_events(scrape_data: ScrapeResponse, client, use_cache: bool = True):
+    """
+    NDJSON events for generating a persona from scrape_data: a "section"
+    event per top-level persona field as soon as the model closes it, then a
+    final "persona" event with the validated PersonaResponse. A "retry"
+    event means the sections sent so far should be discarded. Like
+    build_persona, it makes PERSONA_ATTEMPTS passes over the providers.
+    """
+    async def persona_event(llm_data, fresh: bool = True):
+        persona = merge_persona(scrape_data, llm_data)
+        if fresh:
+            await remember_persona(persona)
+        return ndjson_line({"event": "persona", "data": persona.model_dump()})
+
+    async def events():
+        with span("prompt_build"):
+            prompt = await asyncio.to_thread(generate_persona_prompt, prompt_data(scrape_data))
+        cache_key = persona_cache_key(prompt, provider_chain_id())
+
+        cached = await asyncio.to_thread(persona_cache.get, cache_key) if use_cache else None
+        if cached:
+            for name, value in cached.model_dump(exclude_none=True).items():
+                yield ndjson_line({"event": "section", "name": name, "data": value})
+            yield await persona_event(cached, fresh=False)
+            return
+
+        # Each attempt is a full pass over the provider chain, as in
+        # build_persona, so one transient error doesn't fail the stream.
+        for attempt in range(PERSONA_ATTEMPTS):
+            if attempt:
+                FALLBACKS.inc(kind="llm_retry")
+            for i, provider in enumerate(LLM_PROVIDERS):
+                if i:
+                    FALLBACKS.inc(kind="llm_provider")
+                parser = SectionParser()
+                emitted = False
+                status = "ok"
+                start = time.perf_counter()
+                try:
+                    async for chunk in stream_provider(provider, prompt, client, PERSONA_SCHEMA):
+                        for name, value in parser.feed(chunk):
+                            emitted = True
+                            yield ndjson_line({"event": "section", "name": name, "data": value})
+                except Exception as e:
+                    print(f"{provider_label(provider)} stream error:", e, flush=True)
+                    status = "error"
+                # Spans can't stay open across the yields above, so the stream
+                # is recorded once it ends.
+                record_span(
+                    "llm_stream", time.perf_counter() - start, status,
+                    provider=provider_label(provider),
+                )
+
+                # A cut-off stream still leaves whole fields that can be kept.
+                llm_data = None
+                if parser.buffer:
+                    try:
+                        llm_data = await complete_persona(provider, prompt, parser.buffer, client)
+                    except Exception as e:
+                        print(f"{provider_label(provider)} repair error:", e, flush=True)
+
+                if llm_data:
+                    await asyncio.to_thread(persona_cache.put, cache_key, llm_data)
+                    yield await persona_event(llm_data)
+                    return
+                if emitted:
+                    yield ndjson_line({"event": "retry", "provider": provider_label(provider)})
+
+        yield ndjson_line({
+            "event": "error",
+            "detail": f"Persona generation failed after {PERSONA_ATTEMPTS} attempts",
+        })
+
+    return events()
+
+
+@app.post("/generate_persona/stream")
+async def generate_persona_stream(
+    scrape_data: ScrapeResponse, request: Request, use_cache: bool = True
+):
+    """Streams the persona as NDJSON; see persona_stream_events for the events."""
+    events = persona_stream_events(scrape_data, request.app.state.llm_client, use_cache)
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+
+@app.post("/persona/{username:path}", response_model=PersonaResponse)
+async def persona_for_user(
+    username: str, request: Request, use_cache: bool = True, stream: bool = False
+):
+    """
+    Scrapes `username` and generates their persona in one call, so the
+    scraped posts and comments never round-trip through the client. The
+    scrape result is handed to the LLM stage in memory (and is in the scrape
+    cache for the next call).
+
+    With stream=true the response is NDJSON: a "stage" event as each stage
+    starts, a "scrape" event with the ScrapeResponse once it is available,
+    then the events of /generate_persona/stream.
+
+    `username` may also be a full profile URL (a path route, since an
+    encoded slash is decoded before routing).
+    """
+    username = extract_username(username)
+    client = request.app.state.llm_client
+
+    if not stream:
+        try:
+            scrape_data = await scrape_profile(username)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
+        return await build_persona(scrape_data, client, use_cache)
+
+    async def events():
+        yield ndjson_line({"event": "stage", "stage": "scraping"})
+        try:
+            payload = scrape_payload(username, await fetch_profile(username))
+        except HTTPException as e:
+            yield ndjson_line({"event": "error", "detail": e.detail})
+            return
+        except Exception as e:
+            yield ndjson_line({"event": "error", "detail": f"Scraping failed: {str(e)}"})
+            return
+        yield dumps_bytes({"event": "scrape", "data": payload}) + b"\n"
+
+        yield ndjson_line({"event": "stage", "stage": "analyzing"})
+        scrape_data = ScrapeResponse.model_construct(**payload)
+        async for line in persona_stream_events(scrape_data, client, use_cache):
+            yield line
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
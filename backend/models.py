@@ -1,8 +1,19 @@
 
-from typing import List, Optional
+from typing import List, Optional, TypedDict
 from pydantic import BaseModel, Field
 
 
+class RedditRecord(TypedDict, total=False):
+    """A scraped post or comment, as yielded by the scraper iterators."""
+    type: str
+    fullname: Optional[str]
+    title: Optional[str]
+    body: str
+    subreddit: Optional[str]
+    created_utc: Optional[float]
+    url: str
+
+
 class TextWithURL(BaseModel):
     """Shared model for descriptive entries (text + URL)."""
     text: str
@@ -14,6 +25,12 @@ class ScrapeRequest(BaseModel):
     username: str = Field(..., example="spez")
 
 
+class BatchRequest(BaseModel):
+    """Batch job submission."""
+    usernames: List[str] = Field(..., min_items=1, example=["spez", "kojied"])
+    use_cache: bool = True
+
+
 class ScrapeResponse(BaseModel):
     """Response model from Reddit scraping."""
     username: str
@@ -36,6 +53,7 @@ class ScrapeResponse(BaseModel):
     accept_followers: Optional[bool] = None
     posts: List[dict]
     comments: List[dict]
+    dropped_sources: List[str] = Field(default_factory=list)
 
 
 class PersonaCore(BaseModel):
@@ -84,3 +102,25 @@ class PersonaResponse(BaseModel):
     keywords: List[str] = Field(..., min_items=4, max_items=4)
     personality_type: Optional[str] = None
     emotional_regulation: Optional[str] = None
+
+
+class PersonaUpdateRequest(BaseModel):
+    """A previous persona plus only the posts/comments made since it was built."""
+    previous: PersonaResponse
+    posts: List[dict] = Field(default_factory=list)
+    comments: List[dict] = Field(default_factory=list)
+
+
+# Profile fields carried over from a ScrapeResponse into a PersonaResponse.
+PROFILE_FIELDS = [
+    name for name in PersonaResponse.model_fields if name in ScrapeResponse.model_fields
+]
+
+
+def merge_persona(scrape_data: ScrapeResponse, persona: PersonaCore) -> PersonaResponse:
+    """
+    Combines already-validated profile and persona models without dumping
+    either to dicts (nested TextWithURL models are reused as-is).
+    """
+    profile = {name: getattr(scrape_data, name) for name in PROFILE_FIELDS}
+    return PersonaResponse.model_construct(**profile, **dict(persona))
@@ -1,5 +1,4 @@
 
-import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -7,6 +6,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from scrolling import adaptive_scroll
+
 
 def init_driver(headless=False):
     chrome_options = Options()
@@ -53,10 +54,11 @@ def scrape_new_reddit_user(username, max_scrolls=3):
             )
         )
 
-        for scroll_num in range(max_scrolls):
-            print(f"🌀 Scroll attempt {scroll_num + 1}/{max_scrolls}")
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)  # Allow time for new posts to load
+        scrolls = adaptive_scroll(
+            driver, "div[data-testid='post-container']", max_scrolls=max_scrolls + 1
+        )
+        for scroll_num, (count, waited) in enumerate(scrolls):
+            print(f"🌀 Scroll {scroll_num}/{max_scrolls}: {count} posts after {waited:.2f}s")
 
         posts = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='post-container']")
         print(f"Found {len(posts)} post containers")
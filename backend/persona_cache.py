@@ -0,0 +1,106 @@
+# persona_cache.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from models import PersonaCore
+
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+
+def persona_cache_key(prompt: str, provider_id: str) -> str:
+    return hashlib.sha256(f"{provider_id}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class PersonaCache:
+    """
+    Persisted cache of validated PersonaCore results, keyed by a hash of the
+    final prompt and the provider/model chain. Bounded to `max_entries`,
+    evicting the least recently used rows. Recent hits are also kept as
+    model instances in memory.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000, memory_entries: int = 128):
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+
+        self._memory: "OrderedDict[str, PersonaCore]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS persona_cache ("
+            "key TEXT PRIMARY KEY, persona TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[PersonaCore]:
+        with self._lock:
+            persona = self._memory.get(key)
+            if persona is None:
+                row = self._db.execute(
+                    "SELECT persona FROM persona_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._counters["misses"] += 1
+                    return None
+                persona = PersonaCore.model_validate_json(row[0])
+
+            self._counters["hits"] += 1
+            # A hit only notes the time; the row's last_used is written with
+            # the next put, which is the only time eviction reads it.
+            self._touched[key] = time.time()
+            self._remember(key, persona)
+            return persona
+
+    def put(self, key: str, persona: PersonaCore) -> None:
+        with self._lock:
+            try:
+                if self._touched:
+                    self._db.executemany(
+                        "UPDATE persona_cache SET last_used = ? WHERE key = ?",
+                        [(used, touched) for touched, used in self._touched.items()],
+                    )
+                    self._touched.clear()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO persona_cache (key, persona, last_used) "
+                    "VALUES (?, ?, ?)",
+                    (key, persona.model_dump_json(), time.time()),
+                )
+                evicted = self._db.execute(
+                    "DELETE FROM persona_cache WHERE key IN ("
+                    "SELECT key FROM persona_cache ORDER BY last_used DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+                self._db.commit()
+                self._counters["evictions"] += max(evicted, 0)
+            except sqlite3.Error as e:
+                logging.error(f"[PersonaCache] Failed to persist {key}: {e}")
+            self._remember(key, persona)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, "memory_entries": len(self._memory)}
+
+    def _remember(self, key: str, persona: PersonaCore) -> None:
+        self._memory[key] = persona
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+persona_cache = PersonaCache(
+    os.path.join(CACHE_DIR, "persona_cache.sqlite3"),
+    max_entries=int(os.getenv("PERSONA_CACHE_SIZE", "1000")),
+)
@@ -0,0 +1,252 @@
+# persona_store.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+TRAIT_FIELDS = ("introversion_extroversion", "intuition_sensing", "feeling_thinking", "perceiving_judging")
+KEYWORD_DIM = int(os.getenv("PERSONA_KEYWORD_DIM", "64"))
+KEYWORD_WEIGHT = float(os.getenv("PERSONA_KEYWORD_WEIGHT", "0.3"))
+# Rows scored per step of a search, which bounds its scratch memory.
+SEARCH_CHUNK_ROWS = 65_536
+_INITIAL_CAPACITY = 1024
+
+# Largest distance between two trait vectors with every axis in 1-10.
+_MAX_TRAIT_DISTANCE = float(np.sqrt(len(TRAIT_FIELDS) * 9 ** 2))
+
+
+def keyword_vector(keywords: Iterable[str], dim: int = KEYWORD_DIM) -> np.ndarray:
+    """Hashes keywords into a `dim`-bucket count vector (stable across processes)."""
+    vector = np.zeros(dim, dtype=np.uint8)
+    for keyword in keywords:
+        word = keyword.strip().lower()
+        if word:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+            bucket = int.from_bytes(digest, "little") % dim
+            vector[bucket] = min(int(vector[bucket]) + 1, 255)
+    return vector
+
+
+class PersonaStore:
+    """
+    Every generated persona, reduced to a fixed-size row of bytes: the four
+    1-10 trait axes, then the hashed keyword counts. The rows form one
+    matrix, so a similarity search is a few whole-array operations. The
+    matrix is kept in a flat file. It is either loaded into memory or, with
+    `mmap=True`, memory-mapped so it can grow past RAM. Usernames live in
+    SQLite next to it, mapped to their row; a user's newest persona
+    replaces their row.
+    """
+
+    def __init__(self, directory: str, mmap: bool = False, keyword_dim: int = KEYWORD_DIM):
+        os.makedirs(directory, exist_ok=True)
+        self.mmap = mmap
+        self.keyword_dim = keyword_dim
+        self.row_bytes = len(TRAIT_FIELDS) + keyword_dim
+        self._path = os.path.join(directory, f"personas_{keyword_dim}.u8")
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(
+            os.path.join(directory, "personas.sqlite3"), check_same_thread=False
+        )
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS persona_rows_{keyword_dim} ("
+            "username TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._table = f"persona_rows_{keyword_dim}"
+        self.count = self._db.execute(
+            f"SELECT COALESCE(MAX(row) + 1, 0) FROM {self._table}"
+        ).fetchone()[0]
+
+        if not os.path.exists(self._path):
+            open(self._path, "wb").close()
+        self._data = self._open(max(_INITIAL_CAPACITY, self.count))
+
+    def _open(self, capacity: int) -> np.ndarray:
+        size = capacity * self.row_bytes
+        if os.path.getsize(self._path) < size:
+            with open(self._path, "r+b") as f:
+                f.truncate(size)
+        if self.mmap:
+            return np.memmap(self._path, dtype=np.uint8, mode="r+", shape=(capacity, self.row_bytes))
+        data = np.zeros((capacity, self.row_bytes), dtype=np.uint8)
+        stored = np.fromfile(self._path, dtype=np.uint8, count=self.count * self.row_bytes)
+        data[: self.count] = stored.reshape(self.count, self.row_bytes)
+        return data
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._data)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        if self.mmap:
+            self._data.flush()
+            self._data = self._open(capacity)
+        else:
+            grown = np.zeros((capacity, self.row_bytes), dtype=np.uint8)
+            grown[: len(self._data)] = self._data
+            self._data = grown
+
+    def encode(self, persona) -> np.ndarray:
+        row = np.empty(self.row_bytes, dtype=np.uint8)
+        row[: len(TRAIT_FIELDS)] = [getattr(persona, name) for name in TRAIT_FIELDS]
+        row[len(TRAIT_FIELDS):] = keyword_vector(persona.keywords, self.keyword_dim)
+        return row
+
+    def add(self, username: str, persona) -> None:
+        """Stores `persona` (a PersonaCore or PersonaResponse) as `username`'s row."""
+        self.add_rows([username], self.encode(persona)[None, :])
+
+    def add_rows(self, usernames: Sequence[str], rows: np.ndarray) -> None:
+        """Stores already-encoded rows, e.g. for a bulk import."""
+        now = time.time()
+        with self._lock:
+            try:
+                assigned: Dict[str, int] = {}
+                indices = []
+                for username in usernames:
+                    key = username.lower()
+                    if key not in assigned:
+                        existing = self._db.execute(
+                            f"SELECT row FROM {self._table} WHERE username = ?", (key,)
+                        ).fetchone()
+                        if existing:
+                            assigned[key] = existing[0]
+                        else:
+                            assigned[key] = self.count
+                            self.count += 1
+                    indices.append(assigned[key])
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {self._table} (username, row, updated_at) VALUES (?, ?, ?)",
+                    [(key, index, now) for key, index in assigned.items()],
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"[PersonaStore] Failed to index {len(usernames)} personas: {e}")
+                return
+
+            self._grow(self.count)
+            indices = np.asarray(indices)
+            self._data[indices] = rows
+            if self.mmap:
+                self._data.flush()
+            else:
+                self._write_through(indices, rows)
+
+    def _write_through(self, indices: np.ndarray, rows: np.ndarray) -> None:
+        with open(self._path, "r+b") as f:
+            if indices.size and np.all(np.diff(indices) == 1):
+                f.seek(int(indices[0]) * self.row_bytes)
+                f.write(np.ascontiguousarray(rows).tobytes())
+                return
+            for index, row in zip(indices, rows):
+                f.seek(int(index) * self.row_bytes)
+                f.write(row.tobytes())
+
+    def row_for(self, username: str) -> Optional[np.ndarray]:
+        with self._lock:
+            found = self._db.execute(
+                f"SELECT row FROM {self._table} WHERE username = ?", (username.lower(),)
+            ).fetchone()
+            return np.array(self._data[found[0]]) if found else None
+
+    def query_row(self, traits: Sequence[int], keywords: Iterable[str]) -> np.ndarray:
+        row = np.empty(self.row_bytes, dtype=np.uint8)
+        row[: len(TRAIT_FIELDS)] = traits
+        row[len(TRAIT_FIELDS):] = keyword_vector(keywords, self.keyword_dim)
+        return row
+
+    def similar(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        keyword_weight: float = KEYWORD_WEIGHT,
+        exclude: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        The `k` stored personas closest to `query` (an encoded row). Score is
+        a weighted mix of trait closeness (1 at equal scores, 0 at opposite
+        corners) and cosine similarity of the hashed keyword counts.
+        """
+        with self._lock:
+            data, count = self._data, self.count
+            excluded = None
+            if exclude:
+                found = self._db.execute(
+                    f"SELECT row FROM {self._table} WHERE username = ?", (exclude.lower(),)
+                ).fetchone()
+                excluded = found[0] if found else None
+        if count == 0 or k <= 0:
+            return []
+
+        traits_q = query[: len(TRAIT_FIELDS)].astype(np.float32)
+        keywords_q = query[len(TRAIT_FIELDS):].astype(np.float32)
+        keywords_q_norm = float(np.linalg.norm(keywords_q)) or 1.0
+
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            chunk = np.asarray(data[start:min(start + SEARCH_CHUNK_ROWS, count)], dtype=np.float32)
+            traits = chunk[:, : len(TRAIT_FIELDS)]
+            keywords = chunk[:, len(TRAIT_FIELDS):]
+
+            distance = np.sqrt(np.square(traits - traits_q).sum(axis=1))
+            trait_score = 1.0 - distance / _MAX_TRAIT_DISTANCE
+            norms = np.sqrt(np.square(keywords).sum(axis=1))
+            norms[norms == 0] = 1.0
+            keyword_score = (keywords @ keywords_q) / (norms * keywords_q_norm)
+            scores = (1.0 - keyword_weight) * trait_score + keyword_weight * keyword_score
+            # Empty rows (never written) have all-zero traits, which no persona has.
+            scores[traits[:, 0] == 0] = -np.inf
+            if excluded is not None and start <= excluded < start + len(chunk):
+                scores[excluded - start] = -np.inf
+
+            take = min(k, len(scores))
+            top = np.argpartition(-scores, take - 1)[:take]
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        order = np.argsort(-best_scores, kind="stable")
+        best_scores, best_rows = best_scores[order], best_rows[order]
+        finite = np.isfinite(best_scores)
+        best_scores, best_rows = best_scores[finite], best_rows[finite]
+
+        names = self._usernames(best_rows.tolist())
+        return [
+            {
+                "username": names.get(row),
+                "score": round(float(score), 4),
+                **{name: int(value) for name, value in zip(TRAIT_FIELDS, data[row][: len(TRAIT_FIELDS)])},
+            }
+            for row, score in zip(best_rows.tolist(), best_scores.tolist())
+        ]
+
+    def _usernames(self, rows: List[int]) -> Dict[int, str]:
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = self._db.execute(
+                f"SELECT row, username FROM {self._table} WHERE row IN ({placeholders})", rows
+            ).fetchall()
+        return {row: username for row, username in found}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "personas": self.count,
+                "capacity": len(self._data),
+                "row_bytes": self.row_bytes,
+                "mmap": self.mmap,
+            }
@@ -0,0 +1,141 @@
+# prompt_packing.py
+import hashlib
+import heapq
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+DELTA_TOKEN_BUDGET = int(os.getenv("DELTA_TOKEN_BUDGET", "600"))
+ITEM_TOKEN_CAP = int(os.getenv("PROMPT_ITEM_TOKEN_CAP", "150"))
+MAX_CANDIDATES = 256
+
+CHARS_PER_TOKEN = 4
+RECENCY_HALF_LIFE_DAYS = 90
+SUBREDDIT_REPEAT_PENALTY = 0.7
+
+_NORMALIZE_RE = re.compile(r"https?://\S+|[^a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def fingerprint(text: str) -> str:
+    """Hash of the text with case, punctuation, whitespace and links removed."""
+    normalized = _NORMALIZE_RE.sub(" ", text.lower()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def item_text(item: Dict) -> str:
+    return "\n".join(part for part in (item.get("title"), item.get("body")) if part)
+
+
+def score_item(item: Dict, tokens: int, reference_time: float) -> float:
+    """
+    Informativeness: longer is better with diminishing returns, newer is
+    better. Age is counted back from `reference_time`.
+    """
+    score = math.log1p(min(tokens, ITEM_TOKEN_CAP))
+    created = item.get("created_utc")
+    if created:
+        age_days = max(0.0, (reference_time - created) / 86400)
+        score *= 0.5 + 0.5 * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+    return score
+
+
+def pack_items(
+    items: Iterable[Dict],
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    reference_time: Optional[float] = None,
+) -> List[Dict]:
+    """
+    Chooses the items that give the most evidence within `token_budget`.
+
+    Recency is measured back from `reference_time`, by default the newest
+    item's created_utc. Measuring from "now" instead would make the pick,
+    and so the prompt and its persona cache key, drift with the clock for
+    the same items.
+
+    Only the best MAX_CANDIDATES are held at any time, and near-identical
+    texts are collapsed as they arrive. Given a `reference_time`, items are
+    consumed as a stream, so memory stays flat however long the history is. The final pick is greedy
+    by score and penalizes subreddits that are already represented, so the
+    prompt covers more of the user's interests.
+    """
+    if reference_time is None:
+        items = list(items)
+        reference_time = max((item.get("created_utc") or 0 for item in items), default=0)
+    heap = []
+    by_fingerprint = {}
+    order = 0
+
+    for item in items:
+        text = item_text(item)
+        if not text.strip():
+            continue
+
+        tokens = min(estimate_tokens(text), ITEM_TOKEN_CAP)
+        score = score_item(item, tokens, reference_time)
+        # Cheap score check first; only would-be candidates get fingerprinted.
+        if len(heap) >= MAX_CANDIDATES and score <= heap[0][0]:
+            continue
+        key = fingerprint(text)
+        if key in by_fingerprint:
+            continue
+
+        entry = (score, order, key, tokens, item)
+        order += 1
+
+        if len(heap) < MAX_CANDIDATES:
+            heapq.heappush(heap, entry)
+        else:
+            evicted = heapq.heapreplace(heap, entry)
+            del by_fingerprint[evicted[2]]
+        by_fingerprint[key] = entry
+
+    remaining = token_budget
+    subreddit_counts = {}
+    candidates = sorted(heap, key=lambda e: (-e[0], e[1]))
+    picked = []
+
+    while candidates and remaining > 0:
+        best_index = None
+        best_score = 0.0
+        for index, (score, _, _, tokens, item) in enumerate(candidates):
+            if tokens > remaining:
+                continue
+            repeats = subreddit_counts.get(item.get("subreddit"), 0)
+            adjusted = score * SUBREDDIT_REPEAT_PENALTY ** repeats
+            if best_index is None or adjusted > best_score:
+                best_index, best_score = index, adjusted
+        if best_index is None:
+            break
+
+        _, order, _, tokens, item = candidates.pop(best_index)
+        subreddit = item.get("subreddit")
+        subreddit_counts[subreddit] = subreddit_counts.get(subreddit, 0) + 1
+        remaining -= tokens
+        picked.append((order, tokens, item))
+
+    # Keep the picked items in their original (listing) order.
+    return [
+        {**item, "_tokens": tokens}
+        for order, tokens, item in sorted(picked, key=lambda p: p[0])
+    ]
+
+
+def render_items(packed: List[Dict]) -> str:
+    """Formats packed items for the prompt, keeping each item's URL for citation."""
+    blocks = []
+    for item in packed:
+        text = item_text(item)[: item["_tokens"] * CHARS_PER_TOKEN]
+        header = f"[{item.get('type', 'item')}"
+        if item.get("subreddit"):
+            header += f" in r/{item['subreddit']}"
+        header += f"] URL: {item.get('url') or 'n/a'}"
+        blocks.append(f"{header}\n{text}")
+    return "\n---\n".join(blocks)
@@ -0,0 +1,195 @@
+# rate_limiter.py
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+from requests import Response
+
+from telemetry import RATELIMIT_QUEUE_DEPTH, RATELIMIT_RATE, REDDIT_THROTTLED, record_span
+
+
+# Requests per minute for each class of Reddit endpoint, used until Reddit's
+# X-Ratelimit headers say otherwise. "json" is the anonymous about.json and
+# listing endpoints, "oauth" is PRAW, "html" is Selenium page loads.
+REDDIT_RATES = {
+    "json": float(os.getenv("REDDIT_JSON_QPM", "60")),
+    "oauth": float(os.getenv("REDDIT_OAUTH_QPM", "100")),
+    "html": float(os.getenv("REDDIT_HTML_QPM", "30")),
+}
+RATE_BURST = float(os.getenv("REDDIT_RATE_BURST", "5"))
+BACKOFF_BASE = float(os.getenv("REDDIT_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.getenv("REDDIT_BACKOFF_CAP", "60"))
+MAX_RETRIES = int(os.getenv("REDDIT_MAX_RETRIES", "4"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket for one endpoint class. Callers queue in arrival order
+    instead of failing; the refill rate follows Reddit's rate-limit headers,
+    and a 429 or 5xx pauses the whole class with jittered exponential backoff.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: float = RATE_BURST):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.failures = 0
+        self._updated = time.monotonic()
+        self._next_ticket = 0
+        self._serving = 0
+        self._cond = threading.Condition()
+        RATELIMIT_RATE.set(self.rate, endpoint=name)
+
+    @property
+    def queue_depth(self) -> int:
+        with self._cond:
+            return self._next_ticket - self._serving
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Blocks until this caller's turn and a token are both available. Returns the wait."""
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            RATELIMIT_QUEUE_DEPTH.set(self._next_ticket - self._serving, endpoint=self.name)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if ticket == self._serving:
+                    if now < self.blocked_until:
+                        delay = self.blocked_until - now
+                    elif self.tokens >= 1:
+                        break
+                    else:
+                        delay = (1 - self.tokens) / self.rate
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            self.tokens -= 1
+            self._serving += 1
+            RATELIMIT_QUEUE_DEPTH.set(self._next_ticket - self._serving, endpoint=self.name)
+            self._cond.notify_all()
+        return time.monotonic() - start
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Adapts to a response. Reddit reports the requests left in the current
+        window and the seconds until it resets; the refill rate becomes
+        whatever spreads the remainder evenly over the window. Returns the
+        backoff delay when the response should be retried, else None.
+        """
+        remaining = _header_float(headers, "X-Ratelimit-Remaining")
+        reset = _header_float(headers, "X-Ratelimit-Reset")
+        retry_after = _header_float(headers, "Retry-After")
+
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining is not None and reset is not None:
+                reset = max(reset, 1.0)
+                self.rate = max(remaining, 1.0) / reset
+                self.tokens = min(self.tokens, remaining)
+                if remaining < 1:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                RATELIMIT_RATE.set(self.rate, endpoint=self.name)
+
+            if status not in RETRY_STATUSES:
+                self.failures = 0
+                return None
+
+            self.failures += 1
+            # Full jitter, so queued callers don't all come back at once.
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** self.failures))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            elif status == 429 and reset is not None:
+                delay = max(delay, reset)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self._cond.notify_all()
+
+        REDDIT_THROTTLED.inc(endpoint=self.name, status=status)
+        logging.warning(
+            f"[RateLimit] {self.name} got {status}, pausing {delay:.1f}s "
+            f"({self.failures} in a row, {self.queue_depth} queued)"
+        )
+        return delay
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "queue_depth": self._next_ticket - self._serving,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "tokens": round(self.tokens, 2),
+                "paused_for": round(max(0.0, self.blocked_until - now), 2),
+                "consecutive_failures": self.failures,
+            }
+
+    def penalize(self) -> None:
+        """Backs off after a throttle that came without a status code, e.g. in a browser."""
+        self.observe(429, {})
+
+
+class RedditRateLimiter:
+    """Process-wide limiter shared by every path that talks to Reddit."""
+
+    def __init__(self, rates: Dict[str, float] = REDDIT_RATES, max_retries: int = MAX_RETRIES):
+        self.buckets = {name: TokenBucket(name, per_minute) for name, per_minute in rates.items()}
+        self.max_retries = max_retries
+
+    def acquire(self, endpoint: str) -> None:
+        waited = self.buckets[endpoint].acquire()
+        if waited > 0.001:
+            record_span("ratelimit_wait", waited, endpoint=endpoint)
+
+    def request(self, endpoint: str, send: Callable[[], Response]) -> Response:
+        """
+        Sends a request through the endpoint's bucket, retrying 429s and 5xx
+        after backing off. Returns the last response; callers check its status.
+        """
+        bucket = self.buckets[endpoint]
+        for attempt in range(self.max_retries + 1):
+            self.acquire(endpoint)
+            resp = send()
+            if bucket.observe(resp.status_code, resp.headers) is None or attempt == self.max_retries:
+                return resp
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+reddit_limiter = RedditRateLimiter()
+
+
+def rate_limited_requestor() -> type:
+    """
+    A prawcore requestor class that routes PRAW's HTTP calls through the
+    shared limiter. Built on demand so prawcore is only imported with praw.
+    """
+    from prawcore.requestor import Requestor
+
+    class RateLimitedRequestor(Requestor):
+        def request(self, *args, **kwargs) -> Response:
+            send = super().request
+            return reddit_limiter.request("oauth", lambda: send(*args, **kwargs))
+
+    return RateLimitedRequestor
@@ -0,0 +1,62 @@
+# record_stream.py
+import heapq
+from typing import Iterable, Iterator, List, Optional
+
+from models import RedditRecord
+
+
+def record_size(record: RedditRecord) -> int:
+    """Approximate payload size of a record: its title and body in bytes."""
+    return len((record.get("title") or "").encode("utf-8")) + len(
+        (record.get("body") or "").encode("utf-8")
+    )
+
+
+def take(
+    records: Iterable[RedditRecord],
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Iterator[RedditRecord]:
+    """
+    Yields records until `max_items` have been yielded or the next one would
+    push the total past `max_bytes`. The source is not advanced after that,
+    so lazy sources never fetch pages nobody reads.
+    """
+    if max_items is not None and max_items <= 0:
+        return
+    count = 0
+    size = 0
+    for record in records:
+        if max_bytes is not None:
+            size += record_size(record)
+            if size > max_bytes and count:
+                return
+        yield record
+        count += 1
+        if max_items is not None and count >= max_items:
+            return
+
+
+def merge_records(
+    *sources: Iterable[RedditRecord],
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> List[RedditRecord]:
+    """
+    Streaming merge of newest-first sources: ordered by created_utc
+    (records without one go last), deduped by URL, and cut at the item or
+    byte budget.
+    """
+    merged = heapq.merge(*sources, key=lambda r: -(r.get("created_utc") or 0))
+    return list(take(_dedupe_by_url(merged), max_items, max_bytes))
+
+
+def _dedupe_by_url(records: Iterable[RedditRecord]) -> Iterator[RedditRecord]:
+    seen = set()
+    for record in records:
+        url = record.get("url")
+        if url:
+            if url in seen:
+                continue
+            seen.add(url)
+        yield record
@@ -1,35 +1,60 @@
 
 # reddit_scraper.py
+import contextvars
 import os
 import time
 import logging
-from typing import List, Dict
-
-import praw
-import requests
-from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-
-
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+
+from driver_pool import DriverPool
+from items import intern_name
+from json_scraper import scrape_with_json, session as reddit_session
+from lazy import LazyEngine
+from models import RedditRecord
+from rate_limiter import rate_limited_requestor, reddit_limiter
+from record_stream import merge_records, take
+from scrolling import wait_for_items
+from telemetry import FALLBACKS, ITEMS_SCRAPED, record_span, span
+
+
+def build_reddit_api():
+    # praw is imported here rather than at module level: it is slow to
+    # import and most requests never reach the PRAW source.
+    import praw
+
+    return praw.Reddit(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+        user_agent=os.getenv("REDDIT_USER_AGENT"),
+        # Share the process-wide Reddit rate limit with the other scrapers.
+        requestor_class=rate_limited_requestor(),
+        # Optional API endpoint overrides, e.g. for the benchmark stand-in.
+        **{
+            setting: os.environ[env]
+            for setting, env in (("oauth_url", "REDDIT_OAUTH_URL"), ("reddit_url", "REDDIT_URL"))
+            if os.getenv(env)
+        },
+    )
 
 
-reddit_api = praw.Reddit(
-    client_id=os.getenv("REDDIT_CLIENT_ID"),
-    client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-    user_agent=os.getenv("REDDIT_USER_AGENT"),
-)
+reddit_api = LazyEngine("praw", build_reddit_api)
 
 
 def extract_username(url_or_username: str) -> str:
-    if "reddit.com/user/" in url_or_username:
-        return url_or_username.rstrip("/").split("/")[-1]
-    return url_or_username.strip()
+    value = url_or_username.strip()
+    if "reddit.com/user/" in value or "reddit.com/u/" in value:
+        return value.rstrip("/").split("/")[-1]
+    if value.lstrip("/").startswith("u/"):
+        return value.lstrip("/")[2:].strip("/")
+    return value
 
 
 def init_selenium_driver(headless=True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     chrome_options = Options()
     if headless:
         chrome_options.add_argument("--headless=new")
@@ -44,7 +69,6 @@ def init_selenium_driver(headless=True):
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
 
-    from selenium.webdriver.chrome.service import Service
     service = Service("chromedriver.exe")
     driver = webdriver.Chrome(service=service, options=chrome_options)
 
@@ -64,78 +88,169 @@ def init_selenium_driver(headless=True):
     return driver
 
 
-def scrape_with_selenium(username: str, max_scroll=3) -> Dict[str, List[Dict]]:
+def launch_pooled_driver():
+    with span("selenium_launch"):
+        return init_selenium_driver(headless=True)
+
+
+selenium_pool = DriverPool(
+    launch_pooled_driver,
+    max_size=int(os.getenv("SELENIUM_POOL_SIZE", "2")),
+    max_uses=int(os.getenv("SELENIUM_MAX_USES", "50")),
+    lease_timeout=float(os.getenv("SELENIUM_TIMEOUT", "60")),
+)
+
+
+# Base URLs, overridable so benchmarks can point at a local stand-in.
+OLD_REDDIT_BASE = os.getenv("OLD_REDDIT_BASE", "https://old.reddit.com")
+REDDIT_ABOUT_BASE = os.getenv("REDDIT_ABOUT_BASE", "https://www.reddit.com")
+
+# Old Reddit is server-rendered and paginated: each page arrives complete
+# (or as a #noresults block), and more items are behind the "next" link
+# rather than loaded on scroll.
+OLD_REDDIT_EMPTY_SELECTOR = "#noresults"
+SCROLL_TIMEOUT = float(os.getenv("SCROLL_TIMEOUT", "5"))
+
+_NEXT_PAGE_SCRIPT = """
+const link = document.querySelector(".nav-buttons .next-button a");
+return link ? link.href : null;
+"""
+
+
+# Pulls every field we need from the div.thing nodes that have not been read
+# yet in a single round trip, and tags them so the next scroll skips them.
+_EXTRACT_THINGS_SCRIPT = """
+const out = [];
+for (const node of document.querySelectorAll("div.thing:not([data-scraped])")) {
+    node.setAttribute("data-scraped", "1");
+    const fullname = node.getAttribute("data-fullname");
+    if (!fullname) continue;
+    const entry = node.querySelector("div.entry");
+    out.push({
+        fullname: fullname,
+        body: entry ? entry.innerText : "",
+        url: node.getAttribute("data-url") || "",
+        is_comment: node.classList.contains("comment"),
+    });
+}
+return out;
+"""
+
+
+def extract_new_things(driver) -> List[Dict]:
+    """Returns the div.thing entries added since the previous call."""
+    try:
+        return driver.execute_script(_EXTRACT_THINGS_SCRIPT) or []
+    except Exception as e:
+        logging.warning(f"[Selenium] Failed to extract entries: {e}")
+        return []
+
+
+def scrape_with_selenium(
+    username: str, max_pages=3, target_items: int = 20
+) -> Dict[str, List[Dict]]:
     logging.basicConfig(level=logging.INFO)
-    url = f"https://old.reddit.com/user/{username}"
+    url = f"{OLD_REDDIT_BASE}/user/{username}"
     logging.info(f"[Selenium] Starting scrape for user: {username} at {url}")
 
-    driver = init_selenium_driver(headless=True)
-    driver.get(url)
-    time.sleep(3)
-
     posts = []
     comments = []
-
-    try:
-        for i in range(max_scroll):
-            entries = driver.find_elements(By.CSS_SELECTOR, "div.thing")
-            logging.info(f"[Selenium] Found {len(entries)} items on scroll {i+1}")
-            for entry in entries:
-                try:
-                    body = entry.find_element(By.CSS_SELECTOR, "div.entry").text
-                    link = entry.get_attribute("data-url") or ""
-                    is_comment = "comment" in entry.get_attribute("class")
-                    result = {
-                        "body": body,
-                        "url": link,
+    page_waits = []
+    seen = set()
+
+    # Wait for a page-load slot before leasing, so a queued scrape doesn't
+    # hold a browser it can't use yet.
+    reddit_limiter.acquire("html")
+    with span("selenium_scrape", username=username), selenium_pool.lease() as driver:
+        try:
+            for page in range(max_pages):
+                if page:
+                    reddit_limiter.acquire("html")
+                driver.get(url)
+                if "too many requests" in (driver.title or "").lower():
+                    reddit_limiter.buckets["html"].penalize()
+                    raise RuntimeError("throttled by Reddit")
+
+                count, _, waited = wait_for_items(
+                    driver, "div.thing", OLD_REDDIT_EMPTY_SELECTOR, 0, SCROLL_TIMEOUT
+                )
+                page_waits.append(round(waited, 3))
+                record_span("selenium_page", waited, page=page + 1, items=count)
+                logging.info(
+                    f"[Selenium] Found {count} items on page {page+1} after waiting {waited:.2f}s"
+                )
+                for entry in extract_new_things(driver):
+                    if entry["fullname"] in seen:
+                        continue
+                    seen.add(entry["fullname"])
+                    record = {
+                        "type": "comment" if entry["is_comment"] else "post",
+                        "fullname": entry["fullname"],
+                        "body": entry["body"],
+                        "url": entry["url"],
                     }
-                    if is_comment:
-                        comments.append({"type": "comment", **result})
-                    else:
-                        posts.append({"type": "post", **result})
-                except Exception as inner:
-                    logging.warning(f"[Selenium] Failed to parse entry: {inner}")
-                    continue
-
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-    except Exception as e:
-        logging.error(f"[Selenium] Scrape failed: {e}")
-    finally:
-        driver.quit()
-        logging.info("[Selenium] Driver closed.")
+                    (comments if entry["is_comment"] else posts).append(record)
+
+                if len(posts) + len(comments) >= target_items:
+                    logging.info(f"[Selenium] Reached {target_items} items, stopping early")
+                    break
+                url = driver.execute_script(_NEXT_PAGE_SCRIPT)
+                if not url:
+                    break
+        except Exception as e:
+            logging.error(f"[Selenium] Scrape failed: {e}")
+        finally:
+            logging.info("[Selenium] Driver returned to pool.")
 
     logging.info(f"[Selenium] Scraped {len(posts)} posts and {len(comments)} comments")
+    ITEMS_SCRAPED.inc(len(posts), source="selenium", kind="post")
+    ITEMS_SCRAPED.inc(len(comments), source="selenium", kind="comment")
     return {
         "username": username,
         "posts": posts,
         "comments": comments,
+        "page_waits": page_waits,
     }
 
 
-def scrape_with_praw(username: str, limit: int = 20) -> Dict[str, List[Dict]]:
-    try:
-        user = reddit_api.redditor(username)
-        posts = []
+def iter_praw_records(username: str, kind: str, limit: Optional[int] = None) -> Iterator[RedditRecord]:
+    """
+    Lazily yields a user's newest posts (kind="post") or comments. PRAW only
+    fetches the next page when the iterator gets there.
+    """
+    user = reddit_api.get().redditor(username)
+    if kind == "post":
         for submission in user.submissions.new(limit=limit):
-            posts.append({
+            yield {
                 "type": "post",
+                "fullname": submission.fullname,
                 "title": submission.title,
                 "body": submission.selftext,
-                "subreddit": str(submission.subreddit),
+                "subreddit": intern_name(str(submission.subreddit)),
                 "created_utc": submission.created_utc,
                 "url": f"https://www.reddit.com{submission.permalink}",
-            })
-
-        comments = []
+            }
+    else:
         for comment in user.comments.new(limit=limit):
-            comments.append({
+            yield {
                 "type": "comment",
+                "fullname": comment.fullname,
                 "body": comment.body,
-                "subreddit": str(comment.subreddit),
+                "subreddit": intern_name(str(comment.subreddit)),
                 "created_utc": comment.created_utc,
                 "url": f"https://www.reddit.com{comment.permalink}",
-            })
+            }
+
+
+def scrape_with_praw(
+    username: str, limit: int = 20, max_bytes: Optional[int] = None
+) -> Dict[str, List[Dict]]:
+    try:
+        with span("praw_listing", username=username):
+            posts = list(take(iter_praw_records(username, "post", limit), limit, max_bytes))
+            comments = list(take(iter_praw_records(username, "comment", limit), limit, max_bytes))
+        ITEMS_SCRAPED.inc(len(posts), source="praw", kind="post")
+        ITEMS_SCRAPED.inc(len(comments), source="praw", kind="comment")
 
         return {
             "username": username,
@@ -151,15 +266,45 @@ def scrape_with_praw(username: str, limit: int = 20) -> Dict[str, List[Dict]]:
         }
 
 
-def fetch_user_data(url_or_username: str) -> Dict[str, List[Dict]]:
-    username = extract_username(url_or_username)
+# Per-source deadlines (seconds) for the concurrent fetch, plus an overall
+# deadline for the whole request. Sources that miss theirs are dropped.
+SOURCE_TIMEOUTS = {
+    "about": float(os.getenv("ABOUT_TIMEOUT", "10")),
+    "listing": float(os.getenv("SELENIUM_TIMEOUT", "60")),
+    "praw": float(os.getenv("PRAW_TIMEOUT", "30")),
+}
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "75"))
+
+# How many posts and how many comments to keep per user, and an optional
+# cap on their combined text size.
+HISTORY_DEPTH = int(os.getenv("HISTORY_DEPTH", "10"))
+HISTORY_BYTE_BUDGET = int(os.getenv("HISTORY_BYTE_BUDGET", "0")) or None
+
+# Every concurrent fetch (one per scrape worker) runs all of its sources at
+# once. Deadlines count from submit time, so a pool smaller than that would
+# drop sources that only waited for a thread.
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=max(
+        int(os.getenv("FETCH_WORKERS", "0")),
+        len(SOURCE_TIMEOUTS) * int(os.getenv("SCRAPE_WORKERS", "8")),
+    ),
+    thread_name_prefix="fetch",
+)
 
-    about_url = f"https://www.reddit.com/user/{username}/about.json"
+
+def fetch_about_metadata(username: str) -> Optional[Dict]:
+    """The user's about.json profile fields, or None if the fetch failed."""
+    about_url = f"{REDDIT_ABOUT_BASE}/user/{username}/about.json"
     headers = {"User-Agent": "Mozilla/5.0"}
 
-    metadata = {}
+    metadata = None
     try:
-        resp = requests.get(about_url, headers=headers)
+        with span("about_fetch", username=username) as attrs:
+            resp = reddit_limiter.request(
+                "json",
+                lambda: reddit_session.get(about_url, headers=headers, timeout=SOURCE_TIMEOUTS["about"]),
+            )
+            attrs["status_code"] = resp.status_code
         if resp.status_code == 200:
             data = resp.json().get("data", {})
             subreddit_data = data.get("subreddit", {})
@@ -186,14 +331,108 @@ def fetch_user_data(url_or_username: str) -> Dict[str, List[Dict]]:
     except Exception as e:
         logging.error(f"[About.json] Error fetching metadata: {e}")
 
-    selenium_data = scrape_with_selenium(username)
-    praw_data = scrape_with_praw(username)
+    return metadata
+
 
-    combined_posts = praw_data.get("posts", [])[:10] + selenium_data.get("posts", [])[:10]
-    combined_comments = praw_data.get("comments", [])[:10] + selenium_data.get("comments", [])[:10]
+def scrape_listings(
+    username: str, limit: int = 20, max_bytes: Optional[int] = None
+) -> Dict[str, List[Dict]]:
+    """Reads the public JSON listings, falling back to Selenium if that fails."""
+    try:
+        with span("json_listing", username=username):
+            return scrape_with_json(username, limit, max_bytes)
+    except Exception as e:
+        logging.warning(f"[JSON] Listing scrape failed, falling back to Selenium: {e}")
+        FALLBACKS.inc(kind="selenium_listing")
+        return scrape_with_selenium(username, target_items=limit * 2)
+
+
+def run_sources_concurrently(
+    sources: Dict[str, Callable[[], Dict]],
+    timeouts: Dict[str, float],
+    total_timeout: float,
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Starts every source at once and collects whatever finishes in time.
+    Returns the results by source name and the names of sources that
+    missed their deadline or raised.
+    """
+    start = time.monotonic()
+    # Each source runs in a copy of the caller's context so its spans join
+    # the caller's trace.
+    futures = {
+        name: _fetch_executor.submit(contextvars.copy_context().run, fn)
+        for name, fn in sources.items()
+    }
+
+    results = {}
+    dropped = []
+    # Wait on the tightest deadline first so a slow source never delays the
+    # verdict on a faster one.
+    for name in sorted(futures, key=lambda n: timeouts.get(n, total_timeout)):
+        deadline = min(timeouts.get(name, total_timeout), total_timeout)
+        remaining = max(0.0, deadline - (time.monotonic() - start))
+        try:
+            results[name] = futures[name].result(timeout=remaining)
+        except FutureTimeout:
+            futures[name].cancel()
+            logging.warning(f"[Fetch] Dropping {name}: no result within {deadline:.0f}s")
+            dropped.append(name)
+        except Exception as e:
+            logging.error(f"[Fetch] Dropping {name}: {e}")
+            dropped.append(name)
+
+    return results, dropped
+
+
+def fetch_user_data(
+    url_or_username: str,
+    concurrent: bool = True,
+    source_timeouts: Optional[Dict[str, float]] = None,
+    total_timeout: float = FETCH_TIMEOUT,
+    sources: Optional[Iterable[str]] = None,
+) -> Dict[str, List[Dict]]:
+    username = extract_username(url_or_username)
+
+    all_sources = {
+        "about": lambda: fetch_about_metadata(username),
+        "listing": lambda: scrape_listings(username, HISTORY_DEPTH, HISTORY_BYTE_BUDGET),
+        "praw": lambda: scrape_with_praw(username, HISTORY_DEPTH, HISTORY_BYTE_BUDGET),
+    }
+    sources = {
+        name: fn for name, fn in all_sources.items()
+        if sources is None or name in sources
+    }
+
+    if concurrent:
+        results, dropped = run_sources_concurrently(
+            sources, {**SOURCE_TIMEOUTS, **(source_timeouts or {})}, total_timeout
+        )
+    else:
+        results = {name: fn() for name, fn in sources.items()}
+        dropped = []
+
+    # A failed about fetch returns None rather than raising; count it as
+    # dropped so callers don't cache an empty profile as fresh.
+    metadata = results.get("about")
+    if "about" in sources and metadata is None and "about" not in dropped:
+        dropped.append("about")
+    metadata = metadata or {}
+    listing_data = results.get("listing", {})
+    praw_data = results.get("praw", {})
+
+    combined_posts = merge_records(
+        praw_data.get("posts", []), listing_data.get("posts", []),
+        max_items=HISTORY_DEPTH, max_bytes=HISTORY_BYTE_BUDGET,
+    )
+    combined_comments = merge_records(
+        praw_data.get("comments", []), listing_data.get("comments", []),
+        max_items=HISTORY_DEPTH, max_bytes=HISTORY_BYTE_BUDGET,
+    )
 
     return {
         **metadata,
         "posts": combined_posts,
         "comments": combined_comments,
+        "dropped_sources": dropped,
     }
@@ -0,0 +1,209 @@
+# scrape_cache.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from items import dumps_bytes, loads
+from reddit_scraper import extract_username, fetch_about_metadata, fetch_user_data
+
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+# Profile metadata changes rarely; recent activity goes stale much faster.
+# Posts and comments come from the same listing calls, so they share a TTL.
+FIELD_TTLS = {
+    "profile": float(os.getenv("PROFILE_CACHE_TTL", str(24 * 3600))),
+    "items": float(os.getenv("ITEMS_CACHE_TTL", "900")),
+}
+
+ITEM_SOURCES = ("listing", "praw")
+
+
+class ScrapeCache:
+    """
+    Two-tier cache around fetch_user_data.
+
+    Entries live in an in-process LRU and in SQLite, keyed by the normalized
+    username. The profile and the items (posts and comments) each carry
+    their own fetch time, so a lookup only re-scrapes the parts whose TTL has run out.
+    Concurrent misses for the same user share one fetch.
+    """
+
+    def __init__(self, path: str, max_entries: int = 256, ttls: Dict[str, float] = None):
+        self.max_entries = max_entries
+        self.ttls = ttls or FIELD_TTLS
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scrape_cache ("
+            "username TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "partial_refreshes": 0,
+            "evictions": 0,
+            "coalesced": 0,
+        }
+
+    def get_or_fetch(self, url_or_username: str) -> Dict:
+        key = extract_username(url_or_username).lower()
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._lookup(key, extract_username(url_or_username))
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, "memory_entries": len(self._memory)}
+
+    def _lookup(self, key: str, username: str) -> Dict:
+        entry = self._read(key)
+        now = time.time()
+        stale = {
+            field for field in self.ttls
+            if entry is None or now - entry["fetched_at"].get(field, 0) > self.ttls[field]
+        }
+
+        if not stale:
+            return self._to_result(entry)
+
+        if entry is None or stale >= {"profile", "items"}:
+            with self._lock:
+                self._counters["misses"] += 1
+            fresh = fetch_user_data(username)
+            entry = self._merge({"fetched_at": {}}, fresh, now, refresh_profile=True)
+        else:
+            with self._lock:
+                self._counters["partial_refreshes"] += 1
+            if "items" in stale:
+                fresh = fetch_user_data(username, sources=ITEM_SOURCES)
+                entry = self._merge(entry, fresh, now, refresh_profile=False)
+            if "profile" in stale:
+                profile = fetch_about_metadata(username)
+                if profile is not None:
+                    entry["profile"] = profile
+                    entry["fetched_at"]["profile"] = now
+                dropped = set(entry.get("dropped_sources", [])) - {"about"}
+                if profile is None:
+                    dropped.add("about")
+                entry["dropped_sources"] = sorted(dropped)
+
+        self._write(key, entry)
+        return self._to_result(entry)
+
+    @staticmethod
+    def _merge(entry: Dict, fresh: Dict, now: float, refresh_profile: bool) -> Dict:
+        dropped = set(fresh.get("dropped_sources", []))
+        entry = {**entry, "fetched_at": dict(entry["fetched_at"])}
+
+        if refresh_profile:
+            entry["profile"] = {
+                k: v for k, v in fresh.items()
+                if k not in ("posts", "comments", "dropped_sources")
+            }
+            # Only mark fields fresh when every source behind them answered,
+            # so partial results are served once but refetched next time.
+            if "about" not in dropped:
+                entry["fetched_at"]["profile"] = now
+
+        entry["posts"] = fresh.get("posts", [])
+        entry["comments"] = fresh.get("comments", [])
+        entry["dropped_sources"] = sorted(dropped)
+        if not dropped & set(ITEM_SOURCES):
+            entry["fetched_at"]["items"] = now
+        return entry
+
+    @staticmethod
+    def _to_result(entry: Dict) -> Dict:
+        return {
+            **entry.get("profile", {}),
+            "posts": entry.get("posts", []),
+            "comments": entry.get("comments", []),
+            "dropped_sources": entry.get("dropped_sources", []),
+        }
+
+    def _read(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return self._memory[key]
+
+            row = self._db.execute(
+                "SELECT data FROM scrape_cache WHERE username = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._counters["disk_hits"] += 1
+
+        entry = loads(row[0])
+        self._remember(key, entry)
+        return entry
+
+    def _write(self, key: str, entry: Dict) -> None:
+        self._remember(key, entry)
+        oldest_allowed = time.time() - max(self.ttls.values())
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO scrape_cache (username, data, updated_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, dumps_bytes(entry), time.time()),
+                )
+                self._db.execute(
+                    "DELETE FROM scrape_cache WHERE updated_at < ?", (oldest_allowed,)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"[ScrapeCache] Failed to persist {key}: {e}")
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+
+scrape_cache = ScrapeCache(
+    os.path.join(CACHE_DIR, "scrape_cache.sqlite3"),
+    max_entries=int(os.getenv("SCRAPE_CACHE_SIZE", "256")),
+)
+
+
+def cached_fetch_user_data(url_or_username: str) -> Dict:
+    return scrape_cache.get_or_fetch(url_or_username)
@@ -0,0 +1,75 @@
+# scrolling.py
+import time
+from typing import Iterator, Optional, Tuple
+
+
+_COUNT_SCRIPT = """
+const count = document.querySelectorAll(arguments[0]).length;
+const ended = arguments[1] ? document.querySelector(arguments[1]) !== null : false;
+return [count, ended];
+"""
+
+
+def _page_state(driver, item_selector: str, end_selector: Optional[str]) -> Tuple[int, bool]:
+    count, ended = driver.execute_script(_COUNT_SCRIPT, item_selector, end_selector)
+    return int(count), bool(ended)
+
+
+def wait_for_items(
+    driver,
+    item_selector: str,
+    end_selector: Optional[str] = None,
+    more_than: int = 0,
+    timeout: float = 10.0,
+) -> Tuple[int, bool, float]:
+    """
+    Waits until more than `more_than` items match `item_selector` or the end
+    marker appears. Returns (item_count, reached_end, seconds_waited); on
+    timeout the page is treated as exhausted.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    start = time.monotonic()
+    state = {}
+
+    def ready(drv):
+        state["count"], state["ended"] = _page_state(drv, item_selector, end_selector)
+        return state["count"] > more_than or state["ended"]
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(ready)
+        ended = state["ended"]
+    except TimeoutException:
+        ended = True
+
+    return state.get("count", more_than), ended, time.monotonic() - start
+
+
+def adaptive_scroll(
+    driver,
+    item_selector: str,
+    end_selector: Optional[str] = None,
+    max_scrolls: int = 3,
+    timeout: float = 10.0,
+) -> Iterator[Tuple[int, float]]:
+    """
+    Yields (item_count, seconds_waited) once the first items have rendered,
+    then again after every scroll that loads more items. Stops when the end
+    marker appears, when a scroll loads nothing within `timeout`, or after
+    `max_scrolls` loads. Callers can stop early by breaking out of the loop.
+    """
+    count, ended, waited = wait_for_items(driver, item_selector, end_selector, 0, timeout)
+    yield count, waited
+
+    for _ in range(max_scrolls - 1):
+        if ended:
+            return
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        new_count, ended, waited = wait_for_items(
+            driver, item_selector, end_selector, count, timeout
+        )
+        if new_count <= count:
+            return
+        count = new_count
+        yield count, waited
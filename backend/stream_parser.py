@@ -0,0 +1,86 @@
+# stream_parser.py
+import json
+from typing import Any, List, Tuple
+
+
+class SectionParser:
+    """
+    Incremental parser for a streamed top-level JSON object.
+
+    Feed it text chunks as they arrive; each call returns the (key, value)
+    pairs whose values closed within that chunk. Anything before the opening
+    brace (code fences, chatter) is skipped. A value that does not parse on
+    its own is skipped too, and is left to the full parse at the end of the
+    stream.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect = "key"
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        sections = []
+
+        while self._pos < len(self.buffer) and not self.done:
+            i = self._pos
+            ch = self.buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = json.loads(self.buffer[self._string_start:i + 1])
+                        self._expect = "colon"
+                continue
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":" and self._depth == 1 and self._expect == "colon":
+                self._value_start = i + 1
+                self._expect = "value"
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]" and self._depth > 1:
+                self._depth -= 1
+                # A nested object/array just closed back at the top level:
+                # the section is complete, no need to wait for the comma.
+                if self._depth == 1 and self._expect == "value":
+                    self._emit(i + 1, sections)
+            elif ch in ",}" and self._depth == 1:
+                if self._expect == "value":
+                    self._emit(i, sections)
+                if ch == "}":
+                    self._depth = 0
+                    self.done = True
+                else:
+                    self._expect = "key"
+
+        return sections
+
+    def _emit(self, end: int, sections: List[Tuple[str, Any]]) -> None:
+        raw = self.buffer[self._value_start:end].strip()
+        self._expect = "emitted"
+        try:
+            sections.append((self._key, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass
@@ -0,0 +1,254 @@
+# telemetry.py
+import bisect
+import contextvars
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "2000"))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative) + overflow, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Count and sum per label set."""
+        with self._lock:
+            return {
+                key: {"count": sum(counts), "sum": total}
+                for key, (counts, total) in self._series.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labels, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                cumulative += counts[-1]
+                labels = _format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List = []
+
+STAGE_SECONDS = Histogram(
+    "persona_stage_seconds", "Duration of each pipeline stage.", ("stage", "status")
+)
+ITEMS_SCRAPED = Counter(
+    "persona_items_scraped_total", "Posts and comments scraped, by source.", ("source", "kind")
+)
+LLM_TOKENS_SENT = Counter(
+    "persona_llm_tokens_sent_total", "Prompt tokens sent to LLM providers.", ("provider",)
+)
+FALLBACKS = Counter(
+    "persona_fallbacks_total", "Fallback paths taken, by kind.", ("kind",)
+)
+REDDIT_THROTTLED = Counter(
+    "persona_reddit_throttled_total", "Reddit 429 and 5xx responses, by endpoint class.",
+    ("endpoint", "status"),
+)
+RATELIMIT_QUEUE_DEPTH = Gauge(
+    "persona_reddit_queue_depth", "Requests waiting on the Reddit rate limiter.", ("endpoint",)
+)
+RATELIMIT_RATE = Gauge(
+    "persona_reddit_rate_per_second", "Current Reddit request rate allowed by the limiter.",
+    ("endpoint",),
+)
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Tracing: spans nest through a context variable, so a stage started inside
+# another (in the same task or a thread given a copied context) becomes its
+# child. Finished spans are kept in a ring buffer for /traces and are also
+# mirrored to OpenTelemetry when it is installed and configured.
+
+_current_span: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_finished_spans: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_tracer = otel_trace.get_tracer("reddit_persona") if otel_trace else None
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Times one pipeline stage: records it in persona_stage_seconds and as a
+    span in the current trace. Extra keyword arguments become span
+    attributes; the yielded dict can take more while the stage runs.
+    """
+    parent = _current_span.get()
+    record = {
+        "trace_id": parent["trace_id"] if parent else secrets.token_hex(16),
+        "span_id": secrets.token_hex(8),
+        "parent_id": parent["span_id"] if parent else None,
+        "name": stage,
+        "start": time.time(),
+        "attributes": attributes,
+        "status": "ok",
+    }
+    token = _current_span.set(record)
+    otel_scope = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer else None
+    otel_span = otel_scope.__enter__() if otel_scope is not None else None
+    start = time.perf_counter()
+    try:
+        yield record["attributes"]
+    except BaseException as e:
+        record["status"] = "error"
+        record["attributes"]["error"] = repr(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        record["duration"] = round(duration, 6)
+        _current_span.reset(token)
+        _finished_spans.append(record)
+        STAGE_SECONDS.observe(duration, stage=stage, status=record["status"])
+        if otel_scope is not None:
+            otel_span.set_attributes(
+                {k: v for k, v in record["attributes"].items() if isinstance(v, (str, int, float, bool))}
+            )
+            otel_scope.__exit__(None, None, None)
+        logging.debug(f"[Span] {stage} {record['status']} {duration:.3f}s {record['attributes']}")
+
+
+def record_span(stage: str, duration: float, status: str = "ok", **attributes) -> None:
+    """
+    Records a stage that was timed elsewhere, e.g. one step of a generator,
+    where a `with span(...)` block can't stay open across the yields.
+    """
+    parent = _current_span.get()
+    _finished_spans.append({
+        "trace_id": parent["trace_id"] if parent else secrets.token_hex(16),
+        "span_id": secrets.token_hex(8),
+        "parent_id": parent["span_id"] if parent else None,
+        "name": stage,
+        "start": time.time() - duration,
+        "attributes": attributes,
+        "status": status,
+        "duration": round(duration, 6),
+    })
+    STAGE_SECONDS.observe(duration, stage=stage, status=status)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current["trace_id"] if current else None
+
+
+def recent_traces(limit: int = 20) -> List[Dict]:
+    """The last `limit` traces, newest first, each with its spans in start order."""
+    traces: Dict[str, List[Dict]] = {}
+    for record in reversed(_finished_spans):
+        if record["trace_id"] not in traces:
+            if len(traces) >= limit:
+                continue
+            traces[record["trace_id"]] = []
+        traces[record["trace_id"]].append(record)
+    return [
+        {"trace_id": trace_id, "spans": sorted(spans, key=lambda s: s["start"])}
+        for trace_id, spans in traces.items()
+    ]
@@ -1,4 +1,8 @@
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
 from reddit_scraper import fetch_user_data
 
 
@@ -1,92 +1,362 @@
 
 # utils.py
+import itertools
+import json
 import os
-import re
+from typing import List, Tuple
 
 import httpx
+from pydantic import ValidationError
 
+from json_repair import repair_json
+from models import PersonaCore
+from prompt_packing import (
+    DELTA_TOKEN_BUDGET,
+    PROMPT_TOKEN_BUDGET,
+    estimate_tokens,
+    pack_items,
+    render_items,
+)
+from telemetry import FALLBACKS, LLM_TOKENS_SENT, span
 
-def extract_json_loose(text: str) -> str | None:
-    """
-    Extracts and fixes common malformed JSON issues like missing commas.
-    """
-    # Remove code block markers
-    text = text.strip().replace("```json", "").replace("```", "")
 
-    # Try to find the largest JSON-like structure
-    match = re.search(r'{[\s\S]+}', text)
-    if not match:
-        return None
+HEADERS = {"Content-Type": "application/json"}
 
-    raw_json = match.group()
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
-    # Common fixes for broken JSON
-    # Fix: add missing commas between list items using regex
-    raw_json = re.sub(r'"\s+"', '", "', raw_json)
 
-    # Fix: trailing commas before list/obj endings
-    raw_json = re.sub(r',([\s*[\]}])', r'\1', raw_json)
+def create_llm_client() -> httpx.AsyncClient:
+    """Shared, keep-alive client for LLM providers (HTTP/2 when h2 is installed)."""
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=30,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "50")),
+        ),
+    )
 
-    return raw_json
 
+# Models that honour response_format={"type": "json_schema"}; replies from
+# these are constrained to the PersonaCore schema by the provider.
+STRUCTURED_OUTPUT_MODELS = {
+    model.strip()
+    for model in os.getenv("LLM_STRUCTURED_MODELS", "").split(",")
+    if model.strip()
+}
+# Follow-up turns allowed for re-asking only the fields that didn't validate.
+FIELD_REPAIR_ROUNDS = int(os.getenv("LLM_FIELD_REPAIR_ROUNDS", "1"))
+
+# Prefix the prompt with a locally computed activity summary; the raw items
+# then get PROMPT_BODY_SHARE of the token budget instead of all of it.
+ACTIVITY_SUMMARY = os.getenv("ACTIVITY_SUMMARY", "1") == "1"
+PROMPT_BODY_SHARE = float(os.getenv("PROMPT_BODY_SHARE", "0.75"))
+# Stored posts and comments (each) the summary covers when a full history is known.
+ACTIVITY_HISTORY_ITEMS = int(os.getenv("ACTIVITY_HISTORY_ITEMS", "10000"))
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+LLM_PROVIDERS = [
+    {
+        "name": "OpenRouter",
+        "url": f"{OPENROUTER_BASE_URL}/chat/completions",
+        "key_env": "OPENROUTER_KEY",
+        "model": model,
+        "structured": model in STRUCTURED_OUTPUT_MODELS,
+    }
+    for model in ["google/gemma-3n-e2b-it:free"] + [
+        model.strip()
+        for model in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",")
+        if model.strip()
+    ]
+]
+
+PERSONA_SCHEMA = PersonaCore.model_json_schema()
+REQUIRED_FIELDS = PERSONA_SCHEMA["required"]
+
+
+def provider_label(provider: dict) -> str:
+    return f"{provider['name']}:{provider['model']}"
+
+
+def provider_chain_id() -> str:
+    """Identifies the provider/model chain a response could have come from."""
+    return ",".join(provider_label(p) for p in LLM_PROVIDERS)
+
+
+def persona_schema(fields: List[str] = None) -> dict:
+    """The PersonaCore JSON schema, optionally narrowed to some fields."""
+    if fields is None:
+        return PERSONA_SCHEMA
+    return {
+        "type": "object",
+        "properties": {name: PERSONA_SCHEMA["properties"][name] for name in fields},
+        "required": list(fields),
+        "$defs": PERSONA_SCHEMA.get("$defs", {}),
+    }
+
+
+def completion_body(provider: dict, messages: List[dict], schema: dict = None) -> dict:
+    body = {"model": provider['model'], "messages": messages}
+    if schema is not None and provider.get("structured"):
+        body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "persona", "schema": schema},
+        }
+    return body
 
-HEADERS = {"Content-Type": "application/json"}
 
+def as_messages(content) -> List[dict]:
+    if isinstance(content, str):
+        return [{"role": "user", "content": content}]
+    return content
 
-def call_llm_with_fallback(content: str):
-    messages = [{"role": "user", "content": content}]
 
-    providers = [
-        {
-            "name": "OpenRouter",
-            "url": "https://openrouter.ai/api/v1/chat/completions",
-            "headers": {
+def count_prompt_tokens(provider: dict, messages: List[dict], usage: dict = None) -> None:
+    """Counts tokens sent, from the provider's usage report when it has one."""
+    tokens = (usage or {}).get("prompt_tokens")
+    if tokens is None:
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    LLM_TOKENS_SENT.inc(tokens, provider=provider_label(provider))
+
+
+async def call_provider(
+    provider: dict, content, client: httpx.AsyncClient, schema: dict = None
+) -> str:
+    """
+    Sends one chat completion request and returns the stripped reply text.
+    `content` is a prompt or a list of chat messages. With a schema, providers
+    that support structured output are asked to decode against it.
+    """
+    print(f"Calling provider: {provider_label(provider)}", flush=True)
+    messages = as_messages(content)
+    with span("llm_call", provider=provider_label(provider)) as attrs:
+        response = await client.post(
+            provider['url'],
+            headers={
                 **HEADERS,
-                "Authorization": f"Bearer {os.environ['OPENROUTER_KEY']}"
+                "Authorization": f"Bearer {os.environ[provider['key_env']]}"
             },
-            "model": "google/gemma-3n-e2b-it:free"
-        }
-    ]
+            json=completion_body(provider, messages, schema),
+            timeout=30
+        )
+        attrs["status_code"] = response.status_code
+        response.raise_for_status()
+    print(f"{provider_label(provider)} Response Text:", response.text[:300], flush=True)
+
+    data = response.json()
+    count_prompt_tokens(provider, messages, data.get('usage'))
+    reply = data['choices'][0]['message']['content'].strip()
+
+    if not reply:
+        raise ValueError("Empty LLM response")
+
+    return reply
+
+
+async def stream_provider(
+    provider: dict, content, client: httpx.AsyncClient, schema: dict = None
+):
+    """Streams a chat completion and yields content deltas as they arrive."""
+    print(f"Streaming from provider: {provider_label(provider)}", flush=True)
+    messages = as_messages(content)
+    count_prompt_tokens(provider, messages)
+    async with client.stream(
+        "POST",
+        provider['url'],
+        headers={
+            **HEADERS,
+            "Authorization": f"Bearer {os.environ[provider['key_env']]}"
+        },
+        json={**completion_body(provider, messages, schema), "stream": True},
+        timeout=30
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            # SSE: skip blanks and ": keep-alive" comments, stop at [DONE].
+            if not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                return
+            delta = json.loads(payload)['choices'][0].get('delta', {}).get('content')
+            if delta:
+                yield delta
+
+
+def salvage_persona(data) -> Tuple[dict, List[str]]:
+    """
+    Splits a parsed (possibly broken) persona into the fields that validate
+    and the required fields that don't.
+    """
+    if not isinstance(data, dict):
+        return {}, list(REQUIRED_FIELDS)
+    data = {name: data[name] for name in PersonaCore.model_fields if name in data}
+
+    # Fix what can be fixed in place: trim over-long lists, clamp scores,
+    # drop bad list entries. Then drop whole fields that are still invalid.
+    for _ in range(2):
+        try:
+            PersonaCore.model_validate(data)
+            return data, []
+        except ValidationError as e:
+            errors = e.errors()
+
+        bad_entries = {}
+        bad_fields = set()
+        for error in errors:
+            loc = error["loc"]
+            ctx = error.get("ctx", {})
+            if len(loc) == 1 and error["type"] == "too_long":
+                data[loc[0]] = data[loc[0]][:ctx["max_length"]]
+            elif len(loc) == 1 and error["type"] in ("greater_than_equal", "less_than_equal"):
+                data[loc[0]] = min(max(data[loc[0]], ctx.get("ge", 1)), ctx.get("le", 10))
+            elif len(loc) > 1 and isinstance(loc[1], int):
+                bad_entries.setdefault(loc[0], set()).add(loc[1])
+            else:
+                bad_fields.add(loc[0])
+        for name, indexes in bad_entries.items():
+            if name not in bad_fields:
+                data[name] = [v for i, v in enumerate(data[name]) if i not in indexes]
+        for name in bad_fields:
+            data.pop(name, None)
 
-    for provider in providers:
+    try:
+        PersonaCore.model_validate(data)
+        return data, []
+    except ValidationError as e:
+        invalid = {error["loc"][0] for error in e.errors()}
+    for name in invalid:
+        data.pop(name, None)
+    return data, [name for name in REQUIRED_FIELDS if name in invalid]
+
+
+def parse_persona_reply(raw_text: str) -> Tuple[PersonaCore | None, dict, List[str]]:
+    """
+    Parses an LLM reply. Returns (persona, valid_fields, invalid_fields):
+    the persona when the reply validates, otherwise the fields that could
+    be salvaged and the required ones still missing.
+    """
+    with span("parse") as attrs:
         try:
-            print(f"Calling provider: {provider['name']}", flush=True)
-            response = httpx.post(
-                provider['url'],
-                headers=provider['headers'],
-                json={
-                    "model": provider['model'],
-                    "messages": messages
-                },
-                timeout=30
-            )
-            print(f"{provider['name']} Response Text:", response.text[:300], flush=True)
-
-            data = response.json()
-            content = data['choices'][0]['message']['content'].strip()
-
-            if not content:
-                raise ValueError("Empty LLM response")
-
-            return content
+            return PersonaCore.model_validate_json(raw_text), {}, []
+        except ValidationError:
+            pass
+
+        data, repairs = repair_json(raw_text)
+        valid, invalid = salvage_persona(data)
+        attrs.update(repairs=repairs, invalid=len(invalid))
+    if not invalid:
+        print(f"Parsed persona after {repairs} JSON repairs", flush=True)
+        return PersonaCore.model_validate(valid), valid, []
+    print(f"Persona reply invalid in: {', '.join(invalid)}", flush=True)
+    return None, valid, invalid
+
+
+def parse_persona_text(raw_text: str) -> PersonaCore | None:
+    """Parses an LLM reply into a PersonaCore, or None if it can't be repaired."""
+    return parse_persona_reply(raw_text)[0]
+
+
+def field_repair_prompt(invalid: List[str]) -> str:
+    return (
+        "Some fields of your reply were missing or invalid: "
+        f"{', '.join(invalid)}. Reply with RAW, MINIFIED JSON containing ONLY "
+        "these fields, following this schema. No markdown, no commentary.\n"
+        f"{json.dumps(persona_schema(invalid), separators=(',', ':'))}"
+    )
+
+
+async def complete_persona(
+    provider: dict, content, raw_text: str, client: httpx.AsyncClient
+) -> PersonaCore | None:
+    """
+    Turns a reply into a PersonaCore. When only some fields are broken, the
+    same provider is asked for just those fields in a follow-up turn rather
+    than regenerating the whole persona.
+    """
+    persona, valid, invalid = parse_persona_reply(raw_text)
+    if persona is not None:
+        return persona
+    if len(invalid) == len(REQUIRED_FIELDS):
+        return None
+
+    messages = as_messages(content) + [{"role": "assistant", "content": raw_text}]
+    for _ in range(FIELD_REPAIR_ROUNDS):
+        FALLBACKS.inc(kind="field_repair")
+        messages.append({"role": "user", "content": field_repair_prompt(invalid)})
+        with span("field_repair", fields=",".join(invalid)):
+            reply = await call_provider(provider, messages, client, persona_schema(invalid))
+        messages.append({"role": "assistant", "content": reply})
+
+        fields, _ = repair_json(reply)
+        if isinstance(fields, dict):
+            valid.update({name: fields[name] for name in invalid if name in fields})
+        valid, invalid = salvage_persona(valid)
+        if not invalid:
+            print("Repaired persona by re-asking for the invalid fields", flush=True)
+            return PersonaCore.model_validate(valid)
+    return None
+
+
+async def call_persona_with_fallback(
+    content, client: httpx.AsyncClient
+) -> PersonaCore | None:
+    """Tries each provider in order until one yields a valid persona."""
+    for i, provider in enumerate(LLM_PROVIDERS):
+        if i:
+            FALLBACKS.inc(kind="llm_provider")
+        try:
+            raw_text = await call_provider(provider, content, client, PERSONA_SCHEMA)
+            persona = await complete_persona(provider, content, raw_text, client)
+            if persona is not None:
+                return persona
         except Exception as e:
-            print(f"{provider['name']} Error:", e, flush=True)
-            continue
+            print(f"{provider_label(provider)} Error:", e, flush=True)
 
     return None
 
 
-def generate_persona_prompt(data: dict) -> str:
-    posts_and_comments = data.get("posts", []) + data.get("comments", [])
-    combined_text = "\n---\n".join([
-        item.get("body", "") for item in posts_and_comments if item.get("body")
-    ])
-    limited_text = combined_text[:5000]  # Truncate to reduce LLM overload
+def activity_summary_block(data: dict) -> str:
+    """
+    The ACTIVITY SUMMARY section for `data`, computed over data["history"]
+    (the user's stored history) when given, else over the scraped items.
+    """
+    if not ACTIVITY_SUMMARY:
+        return ""
+    # Imported on first use so workers don't load NumPy at startup.
+    from activity_profile import summarize_activity
+
+    history = data.get("history") or data
+    with span("activity_profile"):
+        summary = summarize_activity(
+            history.get("posts", []), history.get("comments", []), data.get("about")
+        )
+    return f"ACTIVITY SUMMARY (computed from their history):\n{summary}\n\n" if summary else ""
+
+
+def generate_persona_prompt(data: dict, token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    summary_block = activity_summary_block(data)
+    if summary_block:
+        # The summary already carries the structural signals, so fewer raw
+        # items are needed.
+        token_budget = int(token_budget * PROMPT_BODY_SHARE)
+
+    # Pack the most informative items into the token budget instead of
+    # truncating the joined text, keeping each item's URL for citation.
+    packed = pack_items(
+        itertools.chain(data.get("posts", []), data.get("comments", [])), token_budget
+    )
+    limited_text = render_items(packed)
 
     prompt = f"""
 You are a senior behavioral psychologist and personality analyst. Your job is to infer detailed psychological and personality traits based on digital footprints such as Reddit posts and comments.
 
-You are analyzing the following Reddit user's content. Based on their tone, opinions, patterns of speech, emotional tone, and values, construct a detailed persona. The content is a JSON with the user's details, posts and comments. Each post or comment has its own URL for reference.
+You are analyzing the following Reddit user's content. Based on their tone, opinions, patterns of speech, emotional tone, and values, construct a detailed persona. The content is a JSON with the user's details, posts and comments. Each post or comment has its own URL for reference. When an ACTIVITY SUMMARY is given, it was computed over their whole history: use it for their interests, routines and habits, but cite URLs from DATA only.
 
 Your response must follow these strict rules:
 - Output in **RAW, MINIFIED JSON FORMAT ONLY**. No code blocks. No markdown. No explanatory text. No pre/post commentary.
@@ -112,7 +382,39 @@ Schema:
 
 Only return valid JSON. Do not explain anything. Do not add any commentary. Do not wrap the output in code blocks. All values must be properly quoted, and there must be no trailing commas.
 
-DATA:
+{summary_block}DATA:
 {limited_text}
 """
     return prompt.strip()
+
+
+def generate_persona_update_prompt(
+    previous: dict, delta: dict, token_budget: int = DELTA_TOKEN_BUDGET
+) -> str:
+    """
+    Asks the LLM to revise an existing persona in light of new content only.
+    Much shorter than the full prompt: the previous persona stands in for
+    the history it was built from.
+    """
+    packed = pack_items(
+        itertools.chain(delta.get("posts", []), delta.get("comments", [])), token_budget
+    )
+    new_text = render_items(packed)
+    previous_json = json.dumps(previous, separators=(",", ":"), ensure_ascii=False)
+
+    prompt = f"""
+You are a senior behavioral psychologist maintaining a persona of a Reddit user. Below is the persona built from their earlier activity, followed by posts and comments they made since.
+
+Revise the persona using the new content:
+- Adjust the four 1-10 scores only where the new content gives a reason to.
+- Keep list items that still hold, with their original URLs. Rewrite or drop items the new content contradicts, and add items for new insights citing the new URLs.
+- Keep `keywords` to exactly four adjectives.
+- Output the complete revised persona in the same schema as RAW, MINIFIED JSON ONLY. No markdown, no code blocks, no commentary, no trailing commas.
+
+PREVIOUS PERSONA:
+{previous_json}
+
+NEW CONTENT:
+{new_text}
+"""
+    return prompt.strip()
@@ -158,34 +158,60 @@ export default function ScrapeForm() {
     }
   }, [toastMessage])
 
+  // Scrapes and analyzes in one call to /persona/{username}, following the
+  // stage events it streams, so the scraped posts never round-trip through
+  // the browser.
+  const fetchPersona = async (): Promise<{ scrapeData: ScrapeResult; personaData: PersonaResult }> => {
+    const res = await fetch(
+      `http://127.0.0.1:8000/persona/${encodeURIComponent(username.trim())}?stream=true`,
+      { method: 'POST' }
+    )
+    if (!res.ok || !res.body) {
+      throw new Error('Persona generation failed')
+    }
+
+    const result: { scrapeData?: ScrapeResult; personaData?: PersonaResult } = {}
+    const handleEvent = (event: { event: string; stage?: string; data?: unknown; detail?: string }) => {
+      if (event.event === 'stage' && (event.stage === 'scraping' || event.stage === 'analyzing')) {
+        setLoadingStage(event.stage)
+      } else if (event.event === 'scrape') {
+        result.scrapeData = event.data as ScrapeResult
+        setScrapeResult(result.scrapeData)
+      } else if (event.event === 'persona') {
+        result.personaData = event.data as PersonaResult
+      } else if (event.event === 'error') {
+        throw new Error(event.detail || 'Persona generation failed')
+      }
+    }
+
+    const reader = res.body.getReader()
+    const decoder = new TextDecoder()
+    let buffered = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      buffered += decoder.decode(value, { stream: !done })
+      const lines = buffered.split('\n')
+      buffered = lines.pop() ?? ''
+      for (const line of lines) {
+        if (line.trim()) handleEvent(JSON.parse(line))
+      }
+      if (done) break
+    }
+    if (buffered.trim()) handleEvent(JSON.parse(buffered))
+
+    if (!result.scrapeData || !result.personaData) {
+      throw new Error('Persona generation failed')
+    }
+    return { scrapeData: result.scrapeData, personaData: result.personaData }
+  }
+
   const handleScrape = async () => {
     if (!username) return
     setLoadingStage('scraping')
 
     try {
-      const scrapeRes = await fetch('http://127.0.0.1:8000/scrape', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ username }),
-      })
-
-      const scrapeData: ScrapeResult = await scrapeRes.json()
-
+      const { scrapeData, personaData } = await fetchPersona()
       setScrapeResult(scrapeData)
-
-      setLoadingStage('analyzing')
-
-      const analyzeRes = await fetch('http://127.0.0.1:8000/generate_persona', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(scrapeData),
-      })
-
-      if (!analyzeRes.ok) {
-        throw new Error('Persona generation failed')
-      }
-
-      const personaData = await analyzeRes.json()
       setPersonaResult(personaData)
       setToastMessage('Persona analysis complete!')
 